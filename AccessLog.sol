@@ -3,8 +3,18 @@ pragma solidity ^0.8.0;
 
 contract AccessLog {
     event AccessLogged(string username, string fileId, string action, bool granted, string reason, uint256 timestamp);
+    event RootAnchored(bytes32 indexed root, uint32 count, uint256 timestamp);
+
+    // Merkle root of a batch of off-chain access records => block timestamp it was anchored at
+    mapping(bytes32 => uint256) public anchoredAt;
 
     function logAccess(string memory _username, string memory _fileId, string memory _action, bool _granted, string memory _reason) public {
         emit AccessLogged(_username, _fileId, _action, _granted, _reason, block.timestamp);
     }
-}
\ No newline at end of file
+
+    function anchorRoot(bytes32 _root, uint32 _count) public {
+        require(anchoredAt[_root] == 0, "root already anchored");
+        anchoredAt[_root] = block.timestamp;
+        emit RootAnchored(_root, _count, block.timestamp);
+    }
+}
@@ -0,0 +1,23 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.0;
+
+// Fixed-size audit log: the plaintext record stays in the server's local store and
+// only hashes, the file UUID and an action code go on-chain.
+contract AccessLogV2 {
+    // Action codes (see app/components/audit_encoding.py):
+    // 1 REGISTER_USER, 2 REGISTER_USER_BATCH, 3 UPLOAD, 4 DOWNLOAD, 5 ROTATE_MASTER_KEYS, 255 OTHER
+    event AccessLogged(bytes32 indexed userHash, bytes16 indexed fileId, uint8 action, bool granted, bytes32 reasonHash, uint256 timestamp);
+    event RootAnchored(bytes32 indexed root, uint32 count, uint256 timestamp);
+
+    mapping(bytes32 => uint256) public anchoredAt;
+
+    function logAccess(bytes32 _userHash, bytes16 _fileId, uint8 _action, bool _granted, bytes32 _reasonHash) external {
+        emit AccessLogged(_userHash, _fileId, _action, _granted, _reasonHash, block.timestamp);
+    }
+
+    function anchorRoot(bytes32 _root, uint32 _count) external {
+        require(anchoredAt[_root] == 0, "root already anchored");
+        anchoredAt[_root] = block.timestamp;
+        emit RootAnchored(_root, _count, block.timestamp);
+    }
+}
@@ -0,0 +1,70 @@
+import time
+import os
+import sys
+import json
+
+# Path Setup
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.components.crypto_component import CryptoComponent
+from app.components.abe_backends import ABE_BACKENDS, CURVE_SECURITY_BITS
+
+ITERATIONS = 10
+ATTRS = ["role:prof", "dept:cs"]
+POLICY = "(role:prof and dept:cs) or role:admin"
+
+def _avg_ms(fn, iterations):
+    start = time.time()
+    result = None
+    for _ in range(iterations):
+        result = fn()
+    return (time.time() - start) * 1000 / iterations, result
+
+def benchmark_abe_backends():
+    print("=== CP-ABE Scheme x Curve Comparison ===")
+    perf_data = {"layer": "Cryptography", "iterations": ITERATIONS, "policy": POLICY, "combinations": []}
+
+    for scheme in ABE_BACKENDS:
+        for curve, security_bits in CURVE_SECURITY_BITS.items():
+            try:
+                # Keys stay in memory; nothing is written to the shared keys folder
+                crypto = CryptoComponent(curve=curve, scheme=scheme)
+                crypto.setup(force=True)
+
+                keygen_ms, sk_b64 = _avg_ms(lambda: crypto.generate_user_secret(ATTRS), ITERATIONS)
+                aes_key_hex = os.urandom(32).hex()
+                enc_ms, abe_ct = _avg_ms(lambda: crypto.abe_encrypt_str(POLICY, aes_key_hex), ITERATIONS)
+                dec_ms, plain = _avg_ms(lambda: crypto.abe_decrypt_str(abe_ct, sk_b64), ITERATIONS)
+                if plain != aes_key_hex:
+                    raise ValueError("round trip mismatch")
+
+                run = {
+                    "scheme": scheme,
+                    "curve": curve,
+                    "security_bits": security_bits,
+                    "keygen_ms": round(keygen_ms, 2),
+                    "encrypt_ms": round(enc_ms, 2),
+                    "decrypt_ms": round(dec_ms, 2),
+                    "ciphertext_bytes": len(abe_ct),
+                    "user_sk_bytes": len(sk_b64),
+                    "public_key_bytes": len(crypto._pk_b64),
+                }
+                perf_data["combinations"].append(run)
+                print(f"[*] {scheme:9} {curve:7} ({security_bits:3}-bit) | keygen: {keygen_ms:8.2f}ms | "
+                      f"enc: {enc_ms:8.2f}ms | dec: {dec_ms:8.2f}ms | ct: {len(abe_ct):6} B | "
+                      f"sk: {len(sk_b64):6} B | pk: {len(crypto._pk_b64):7} B")
+            except Exception as e:
+                print(f"[!] {scheme} on {curve} failed: {e}")
+                perf_data["combinations"].append({"scheme": scheme, "curve": curve, "error": str(e)})
+
+    output_dir = os.path.join(current_dir, "results")
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, "abe_backend_comparison.json"), "w") as f:
+        json.dump(perf_data, f, indent=4)
+    print(f"\n[!] Backend comparison saved to {output_dir}/abe_backend_comparison.json")
+
+if __name__ == "__main__":
+    benchmark_abe_backends()
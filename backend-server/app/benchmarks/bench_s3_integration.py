@@ -67,6 +67,8 @@ def run_integration_benchmark():
         # Cleanup local encrypted file
         if os.path.exists(enc_file_path):
             os.remove(enc_file_path)
+        if os.path.exists(meta["index_file_path"]):
+            os.remove(meta["index_file_path"])
 
     # Save to JSON
     out_dir = os.path.join(current_dir, "results")
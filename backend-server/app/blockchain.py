@@ -0,0 +1,96 @@
+# blockchain.py
+"""
+Audit contract bindings, signer accounts and the synchronous logAccess call.
+Importing this only builds the Web3 objects (no server components or threads),
+so benchmarks can use it directly.
+"""
+import os
+from web3 import Web3
+
+from app.components.audit_encoding import encode_record
+from app.components.signer_pool import SignerPool
+
+# --- Blockchain Configuration ---
+# Use the RPC URL from your Anvil terminal
+RPC_URL = "http://127.0.0.1:8545"
+w3 = Web3(Web3.HTTPProvider(RPC_URL))
+CONTRACT_ADDRESS ="0x5FbDB2315678afecb367f032d93F642f64180aa3"
+CONTRACT_ABI = [
+    {
+        "type": "function",
+        "name": "logAccess",
+        "inputs": [
+            {"name": "_username", "type": "string"},
+            {"name": "_fileId", "type": "string"},
+            {"name": "_action", "type": "string"},
+            {"name": "_granted", "type": "bool"},
+            {"name": "_reason", "type": "string"}
+        ],
+        "outputs": [],
+        "stateMutability": "nonpayable"
+    },
+    {
+        "type": "function",
+        "name": "anchorRoot",
+        "inputs": [
+            {"name": "_root", "type": "bytes32"},
+            {"name": "_count", "type": "uint32"}
+        ],
+        "outputs": [],
+        "stateMutability": "nonpayable"
+    },
+    {
+        "type": "function",
+        "name": "anchoredAt",
+        "inputs": [{"name": "", "type": "bytes32"}],
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "view"
+    }
+]
+contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
+# AccessLogV2: fixed-size fields (hashed user/reason, bytes16 file UUID, uint8 action)
+CONTRACT_V2_ADDRESS = os.environ.get("AUDIT_CONTRACT_V2")
+CONTRACT_V2_ABI = [
+    {
+        "type": "function",
+        "name": "logAccess",
+        "inputs": [
+            {"name": "_userHash", "type": "bytes32"},
+            {"name": "_fileId", "type": "bytes16"},
+            {"name": "_action", "type": "uint8"},
+            {"name": "_granted", "type": "bool"},
+            {"name": "_reasonHash", "type": "bytes32"}
+        ],
+        "outputs": [],
+        "stateMutability": "nonpayable"
+    }
+] + CONTRACT_ABI[1:]
+contract_v2 = w3.eth.contract(address=CONTRACT_V2_ADDRESS, abi=CONTRACT_V2_ABI) if CONTRACT_V2_ADDRESS else None
+# Using the first default account from Anvil
+PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+ACCOUNT_ADDRESS = "0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266"
+# Extra funded accounts (comma-separated private keys) to spread audit transactions across;
+# each keeps its own local nonce, so concurrent senders never wait on one account's ordering
+AUDIT_SIGNER_KEYS = [k for k in os.environ.get("AUDIT_SIGNER_KEYS", "").split(",") if k]
+signers = SignerPool(w3, [(ACCOUNT_ADDRESS, PRIVATE_KEY)] + [
+    (w3.eth.account.from_key(k).address, k) for k in AUDIT_SIGNER_KEYS if k != PRIVATE_KEY
+])
+
+def log_to_blockchain(username, file_id, action, granted, reason, encoding="v1"):
+    """Sends an access audit log to the Ethereum Smart Contract (v1 strings or v2 fixed-size) and returns gas used."""
+    try:
+        if encoding == "v2":
+            call = contract_v2.functions.logAccess(*encode_record(username, file_id, action, granted, reason))
+        else:
+            call = contract.functions.logAccess(username, file_id, action, granted, reason)
+        tx_hash, _ = signers.send(call, gas=200000, gas_price_gwei=20)
+        
+        # --- NEW: Capture receipt to get gas metrics ---
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        gas_used = receipt.get('gasUsed', 0)
+        
+        print(f"Blockchain Audit Logged: {file_id} for {username} (TX: {w3.to_hex(tx_hash)}) | Gas: {gas_used}")
+        return gas_used  # Returning this allows your benchmark script to save it
+    except Exception as e:
+        print(f"Blockchain logging failed: {e}")
+        return 0
@@ -0,0 +1,122 @@
+# backend/components/abe_backends.py
+"""
+CP-ABE scheme adapters, so CryptoComponent can switch scheme and pairing
+curve without caring how each Charm scheme names its keys and ciphertext parts.
+"""
+from typing import Any
+
+try:
+    from charm.schemes.abenc.waters11 import Waters11
+except Exception:
+    Waters11 = None
+
+try:
+    from charm.schemes.abenc.abenc_bsw07 import CPabe_BSW07
+    from charm.toolbox.secretutil import SecretUtil
+except Exception:
+    CPabe_BSW07 = None
+    SecretUtil = None
+
+# Nominal security level (bits) of Charm's pairing groups, as published when
+# the curves were chosen; newer NFS variants lower the MNT/BN figures somewhat.
+CURVE_SECURITY_BITS = {
+    "SS512": 80,
+    "MNT224": 112,
+    "BN254": 128,
+}
+
+
+class Waters11Backend:
+    """Waters11 small-universe CP-ABE: the PK holds one h_i per attribute (uni_size)."""
+
+    name = "waters11"
+    # Ciphertext layout used by the binary envelope (order matters)
+    element_fields = ("c0", "c_m")
+    attr_fields = ("C", "D")
+    supports_transform = True
+
+    def __init__(self, group, uni_size: int):
+        if Waters11 is None:
+            raise RuntimeError("Waters11 is not available in this charm-crypto install")
+        self.scheme = Waters11(group, uni_size, verbose=False)
+        self.util = self.scheme.util
+
+    def setup(self):
+        return self.scheme.setup()
+
+    def keygen(self, pk, msk, attributes: list[str]):
+        return self.scheme.keygen(pk, msk, attributes)
+
+    def encrypt(self, pk, msg, policy_str: str):
+        return self.scheme.encrypt(pk, msg, policy_str)
+
+    def decrypt(self, pk, ct: dict, sk):
+        return self.scheme.decrypt(pk, ct, sk)
+
+    def attach_policy(self, ct: dict, tree, policy_str: str):
+        ct['policy'] = tree
+
+    def sk_attributes(self, sk) -> list[str]:
+        return sk['attr_list']
+
+    def restrict_sk(self, sk, attributes) -> Any:
+        return dict(sk, attr_list=list(attributes))
+
+    def fixed_bases(self, pk) -> list:
+        # keygen raises g1_a, g2 and h[attr]; encrypt also raises e_gg_alpha
+        bases = [pk['g1_a'], pk['g2'], pk['e_gg_alpha']]
+        return bases + [h for h in pk['h'] if hasattr(h, "initPP")]  # h[0] is a placeholder int
+
+
+class BSW07Backend:
+    """Bethencourt-Sahai-Waters CP-ABE: large universe, attributes are hashed into G2,
+    so the PK size does not depend on how many attributes exist."""
+
+    name = "bsw07"
+    element_fields = ("C_tilde", "C")
+    attr_fields = ("Cy", "Cyp")
+    supports_transform = False
+
+    def __init__(self, group, uni_size: int):
+        if CPabe_BSW07 is None:
+            raise RuntimeError("CPabe_BSW07 is not available in this charm-crypto install")
+        self.scheme = CPabe_BSW07(group)
+        self.util = SecretUtil(group, verbose=False)
+
+    def setup(self):
+        return self.scheme.setup()
+
+    def keygen(self, pk, msk, attributes: list[str]):
+        return self.scheme.keygen(pk, msk, attributes)
+
+    def encrypt(self, pk, msg, policy_str: str):
+        return self.scheme.encrypt(pk, msg, policy_str)
+
+    def decrypt(self, pk, ct: dict, sk):
+        result = self.scheme.decrypt(pk, sk, ct)
+        return None if result is False else result
+
+    def attach_policy(self, ct: dict, tree, policy_str: str):
+        # BSW07 parses the policy string itself during decrypt
+        ct['policy'] = policy_str
+
+    def sk_attributes(self, sk) -> list[str]:
+        return sk['S']
+
+    def restrict_sk(self, sk, attributes) -> Any:
+        return dict(sk, S=list(attributes))
+
+    def fixed_bases(self, pk) -> list:
+        return [pk['g'], pk['g2'], pk['h'], pk['e_gg_alpha']]
+
+
+ABE_BACKENDS = {
+    Waters11Backend.name: Waters11Backend,
+    BSW07Backend.name: BSW07Backend,
+}
+
+
+def make_abe_backend(name: str, group, uni_size: int):
+    if name not in ABE_BACKENDS:
+        raise ValueError(f"Unknown ABE scheme '{name}' (choose from {', '.join(ABE_BACKENDS)})")
+    return ABE_BACKENDS[name](group, uni_size)
@@ -0,0 +1,585 @@
+# backend/components/audit_component.py
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+from .audit_encoding import encode_record
+from .merkle import leaf_hash, merkle_proof, merkle_root, verify_proof
+
+
+def record_leaf(entry):
+    """Leaf hash of one audit record; the JSON is canonical so anyone holding the record can recompute it."""
+    return leaf_hash(json.dumps(entry, sort_keys=True, separators=(",", ":")).encode())
+
+
+class AnchorStore:
+    """
+    Local home of anchored audit records: one JSON file per batch holding the
+    records, their leaf hashes, the Merkle root and the anchoring transaction.
+    Everything needed to build an inclusion proof stays here; the chain only
+    ever sees the root.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._record_batch = {}
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                batch = self._read(name[:-5])
+                for entry in batch["records"]:
+                    self._record_batch[entry["id"]] = batch["batch_id"]
+
+    def _path(self, batch_id):
+        return os.path.join(self.directory, f"{batch_id}.json")
+
+    def _read(self, batch_id):
+        with open(self._path(batch_id), "r") as f:
+            return json.load(f)
+
+    def _write(self, batch):
+        tmp = self._path(batch["batch_id"]) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(batch, f)
+        os.replace(tmp, self._path(batch["batch_id"]))
+
+    def save_batch(self, batch):
+        with self._lock:
+            self._write(batch)
+            for entry in batch["records"]:
+                self._record_batch[entry["id"]] = batch["batch_id"]
+
+    def update_batch(self, batch_id, **fields):
+        with self._lock:
+            batch = self._read(batch_id)
+            batch.update(fields)
+            self._write(batch)
+
+    def get_batch(self, batch_id):
+        with self._lock:
+            if not os.path.exists(self._path(batch_id)):
+                return None
+            return self._read(batch_id)
+
+    def batch_for_record(self, record_id):
+        with self._lock:
+            batch_id = self._record_batch.get(record_id)
+        return self.get_batch(batch_id) if batch_id else None
+
+    def count(self):
+        with self._lock:
+            return len(self._record_batch)
+
+
+class RecordLog:
+    """
+    Append-only JSON-lines copy of every record confirmed through AccessLogV2,
+    with its transaction. The chain only holds hashes, so this is where the
+    plaintext lives.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def append(self, entry, tx_hash, block_number, status):
+        line = json.dumps({"entry": entry, "tx_hash": tx_hash, "block_number": block_number, "status": status})
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def find(self, record_id):
+        with self._lock:
+            if not os.path.exists(self.path):
+                return None
+            with open(self.path, "r") as f:
+                for line in f:
+                    row = json.loads(line)
+                    if row["entry"]["id"] == record_id:
+                        return row
+        return None
+
+
+class AuditComponent:
+    """
+    Asynchronous blockchain audit pipeline.
+
+    Requests call submit(), which only enqueues a record. Sender threads,
+    one per account in the SignerPool, drain the queue, send each
+    transaction with a locally tracked nonce, and hand the hash to a
+    receipt thread, so nobody waits a block time on the request path.
+
+    mode="tx" sends one logAccess transaction per record, either with the
+    v1 string arguments or (encoding="v2") as AccessLogV2's fixed-size
+    hashes, with the plaintext kept in a RecordLog. mode="anchor"
+    collects records for up to anchor_window seconds or anchor_batch_size
+    records, stores them in the AnchorStore and anchors only their Merkle
+    root through anchorRoot(); prove()/verify() then show a record was
+    part of an anchored batch.
+
+    Backpressure: the queue is bounded (max_queue) and so is the number of
+    sent-but-unconfirmed transactions (max_inflight). When the chain falls
+    behind, the sender stops at max_inflight, the queue fills, and submit()
+    blocks for up to enqueue_timeout before rejecting the record.
+
+    With an AuditJournal every record is fsynced to the journal before it is
+    queued and marked done once its transaction is confirmed. A full queue
+    or an unreachable RPC then only delays records: a replayer re-queues
+    unconfirmed journal entries every replay_interval while the chain is up.
+    """
+
+    def __init__(self, w3, contract, signers, max_queue=10000, max_inflight=64,
+                 batch_size=32, enqueue_timeout=2.0, gas=200000, gas_price_gwei=20, poll_interval=0.5,
+                 receipt_timeout=120.0, mode="tx", anchor_store=None, anchor_window=30.0,
+                 anchor_batch_size=1024, anchor_retries=3, journal=None, replay_interval=10.0,
+                 encoding="v1", record_log=None):
+        if mode not in ("tx", "anchor"):
+            raise ValueError(f"Unknown audit mode: {mode}")
+        if mode == "anchor" and anchor_store is None:
+            raise ValueError("anchor mode needs an AnchorStore")
+        if encoding not in ("v1", "v2"):
+            raise ValueError(f"Unknown audit encoding: {encoding}")
+        if mode == "tx" and encoding == "v2" and record_log is None:
+            raise ValueError("v2 encoding keeps plaintext locally and needs a RecordLog")
+        self.w3 = w3
+        self.contract = contract
+        self.signers = signers
+        self.batch_size = batch_size
+        self.max_inflight = max_inflight
+        self.enqueue_timeout = enqueue_timeout
+        self.gas = gas
+        self.gas_price_gwei = gas_price_gwei
+        self.poll_interval = poll_interval
+        self.receipt_timeout = receipt_timeout
+        self.mode = mode
+        self.store = anchor_store
+        self.anchor_window = anchor_window
+        self.anchor_batch_size = anchor_batch_size
+        self.anchor_retries = anchor_retries
+        self.journal = journal
+        self.replay_interval = replay_interval
+        self.encoding = encoding
+        self.record_log = record_log
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._retry = deque()
+        self._inflight = deque()
+        self._inflight_slots = threading.Semaphore(max_inflight)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sender_done = threading.Event()
+        self._senders_running = 0
+        self._threads = []
+        # Journal ids currently queued, batched or in flight (the replayer skips these)
+        self._outstanding = set()
+
+        self.enqueued = 0
+        self.rejected = 0
+        self.deferred = 0
+        self.replayed = 0
+        self.sent = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.reverted = 0
+        self.gas_used_total = 0
+        self.records_confirmed = 0
+        self.max_depth_seen = 0
+        # Recent samples (seconds) for lag percentiles
+        self._queue_lag = deque(maxlen=1000)
+        self._confirm_lag = deque(maxlen=1000)
+
+    # ---------- Producer side ----------
+    def _enqueue(self, entry, timeout):
+        with self._lock:
+            self._outstanding.add(entry["id"])
+        try:
+            if timeout:
+                self._queue.put({"entry": entry, "enqueued_at": time.time()}, timeout=timeout)
+            else:
+                self._queue.put_nowait({"entry": entry, "enqueued_at": time.time()})
+        except queue.Full:
+            with self._lock:
+                self._outstanding.discard(entry["id"])
+            return False
+        with self._lock:
+            self.enqueued += 1
+            self.max_depth_seen = max(self.max_depth_seen, self._queue.qsize())
+        return True
+
+    def submit(self, username, file_id, action, granted, reason):
+        """
+        Queue one audit record; returns its id. Without a journal, returns None
+        if the pipeline stayed full for enqueue_timeout.
+        """
+        entry = {
+            "id": uuid.uuid4().hex,
+            "username": username,
+            "file_id": file_id,
+            "action": action,
+            "granted": bool(granted),
+            "reason": reason,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        if self.journal is not None:
+            # Durable first; if the queue is full the replayer sends it later
+            with self._lock:
+                self._outstanding.add(entry["id"])  # so the replayer can't race us to it
+            self.journal.append(entry)
+            if not self._enqueue(entry, 0):
+                with self._lock:
+                    self.deferred += 1
+            return entry["id"]
+        if not self._enqueue(entry, self.enqueue_timeout):
+            with self._lock:
+                self.rejected += 1
+            print(f"[AUDIT] Queue full, record rejected: {action} {file_id} for {username}")
+            return None
+        return entry["id"]
+
+    # ---------- Sender ----------
+    def _contract_call(self, item):
+        if item["kind"] == "anchor":
+            return self.contract.functions.anchorRoot(bytes.fromhex(item["root"]), len(item["records"]))
+        e = item["records"][0]["entry"]
+        args = (e["username"], e["file_id"], e["action"], e["granted"], e["reason"])
+        if self.encoding == "v2":
+            args = encode_record(*args)
+        return self.contract.functions.logAccess(*args)
+
+    @staticmethod
+    def _describe(item):
+        if item["kind"] == "anchor":
+            return f"anchor of batch {item['batch_id']} ({len(item['records'])} records)"
+        e = item["records"][0]["entry"]
+        return f"{e['action']} {e['file_id']}"
+
+    def _send_one(self, item):
+        # The pool resyncs the account's nonce and retries once before giving up
+        try:
+            return self.signers.send(self._contract_call(item), self.gas, self.gas_price_gwei)
+        except Exception as e:
+            print(f"[AUDIT] Send failed for {self._describe(item)}: {e}")
+            return None, None
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.poll_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _take_window(self):
+        """Records for one anchor: up to anchor_batch_size, or whatever arrived within anchor_window of the first."""
+        try:
+            records = [self._queue.get(timeout=self.poll_interval)]
+        except queue.Empty:
+            return []
+        deadline = records[0]["enqueued_at"] + self.anchor_window
+        while len(records) < self.anchor_batch_size:
+            timeout = 0 if self._stop.is_set() else deadline - time.time()
+            try:
+                records.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def _seal_batch(self, records):
+        """Build the batch's tree and persist it before anything is sent, so no record exists only in memory."""
+        leaves = [record_leaf(r["entry"]) for r in records]
+        batch = {
+            "batch_id": uuid.uuid4().hex,
+            "root": merkle_root(leaves).hex(),
+            "leaves": [leaf.hex() for leaf in leaves],
+            "records": [r["entry"] for r in records],
+            "created": datetime.utcnow().isoformat(),
+            "status": "pending",
+            "tx_hash": None,
+            "block_number": None,
+        }
+        self.store.save_batch(batch)
+        return {"kind": "anchor", "batch_id": batch["batch_id"], "root": batch["root"],
+                "records": records, "attempts": 0}
+
+    def _next_items(self):
+        try:
+            return [self._retry.popleft()]
+        except IndexError:
+            pass
+        if self.mode == "anchor":
+            records = self._take_window()
+            return [self._seal_batch(records)] if records else []
+        return [{"kind": "record", "records": [r]} for r in self._take_batch()]
+
+    def _oldest(self, item):
+        return item["records"][0]["enqueued_at"]
+
+    def _give_up(self, item, reason):
+        """Count a transaction as failed; an anchor gets re-sent up to anchor_retries times first."""
+        with self._lock:
+            self.failed += 1
+        if item["kind"] == "anchor":
+            item["attempts"] += 1
+            if item["attempts"] < self.anchor_retries:
+                self._retry.append(item)
+                return
+            self.store.update_batch(item["batch_id"], status="failed", error=reason)
+        # Still pending in the journal (if any); the replayer will pick it up again
+        with self._lock:
+            self._outstanding.difference_update(r["entry"]["id"] for r in item["records"])
+
+    def _sender_loop(self):
+        while not (self._stop.is_set() and self._queue.empty() and not self._retry):
+            for item in self._next_items():
+                first_attempt = item.get("attempts", 0) == 0
+                self._inflight_slots.acquire()
+                sent_at = time.time()
+                tx_hash, signer = self._send_one(item)
+                with self._lock:
+                    self._queue_lag.append(sent_at - self._oldest(item))
+                    if tx_hash is not None:
+                        self.sent += 1
+                        self._inflight.append((tx_hash, item, sent_at, signer))
+                if tx_hash is None:
+                    self._inflight_slots.release()
+                    self._give_up(item, "send failed")
+                if first_attempt:
+                    for _ in item["records"]:
+                        self._queue.task_done()
+        with self._lock:
+            self._senders_running -= 1
+            if not self._senders_running:
+                self._sender_done.set()
+
+    # ---------- Receipts ----------
+    def _poll_receipt(self, tx_hash):
+        try:
+            return self.w3.eth.get_transaction_receipt(tx_hash)
+        except Exception:
+            return None  # not mined yet (TransactionNotFound) or a transient RPC error
+
+    def _confirm(self, tx_hash, item, receipt):
+        ok = receipt.get("status", 1) != 0
+        if not ok and item["kind"] == "anchor" and item["attempts"]:
+            # A retry reverts if the earlier attempt was mined after all
+            try:
+                ok = bool(self.anchored_at(item["root"]))
+            except Exception:
+                pass
+        with self._lock:
+            self.confirmed += 1
+            self.gas_used_total += receipt.get("gasUsed", 0)
+            if ok:
+                self.records_confirmed += len(item["records"])
+            else:
+                self.reverted += 1
+            now = time.time()
+            for record in item["records"]:
+                self._confirm_lag.append(now - record["enqueued_at"])
+        ids = [r["entry"]["id"] for r in item["records"]]
+        if self.record_log is not None and item["kind"] == "record":
+            # Before the journal lets go of it, so the plaintext is never only on-chain as a hash
+            self.record_log.append(item["records"][0]["entry"], self.w3.to_hex(tx_hash),
+                                   receipt.get("blockNumber"), "confirmed" if ok else "reverted")
+        if self.journal is not None:
+            # A revert is final too: replaying the same call would only revert again
+            self.journal.mark_done(ids)
+        if item["kind"] == "anchor":
+            self.store.update_batch(
+                item["batch_id"], status="anchored" if ok else "reverted",
+                tx_hash=self.w3.to_hex(tx_hash), block_number=receipt.get("blockNumber"),
+            )
+        # Last: until the journal has marked them done, the replayer must still see them in flight
+        with self._lock:
+            self._outstanding.difference_update(ids)
+
+    def _receipt_loop(self):
+        while not (self._sender_done.is_set() and not self._inflight):
+            with self._lock:
+                pending = list(self._inflight)
+            done = []
+            for tx_hash, item, sent_at, signer in pending:
+                receipt = self._poll_receipt(tx_hash)
+                if receipt is None:
+                    if time.time() - sent_at > self.receipt_timeout:
+                        # Dropped by the node; give the slot back and resync that account's nonce
+                        done.append(tx_hash)
+                        signer.nonces.resync()
+                        print(f"[AUDIT] No receipt after {self.receipt_timeout}s for {self._describe(item)}")
+                        self._give_up(item, "no receipt")
+                    continue
+                done.append(tx_hash)
+                self._confirm(tx_hash, item, receipt)
+            if done:
+                finished = set(done)
+                with self._lock:
+                    self._inflight = deque(entry for entry in self._inflight if entry[0] not in finished)
+                for _ in done:
+                    self._inflight_slots.release()
+            if not done:
+                # Not _stop.wait(): after stop() it returns at once and this loop would spin while draining
+                time.sleep(self.poll_interval)
+
+    # ---------- Journal replay ----------
+    def _chain_up(self):
+        try:
+            return self.w3.is_connected()
+        except Exception:
+            return False
+
+    def replay(self):
+        """Re-queue journal entries that are neither confirmed nor in the pipeline; returns how many."""
+        if self.journal is None:
+            return 0
+        with self._lock:
+            todo = [e for e in self.journal.pending() if e["id"] not in self._outstanding]
+        if not todo or not self._chain_up():
+            return 0
+        count = 0
+        for entry in todo:
+            if not self._enqueue(entry, 0):
+                break
+            count += 1
+        if count:
+            with self._lock:
+                self.replayed += count
+            print(f"[AUDIT] Replayed {count} journaled records ({len(todo) - count} still waiting)")
+        return count
+
+    def _replay_loop(self):
+        while True:
+            try:
+                self.replay()
+            except Exception as e:
+                print("[AUDIT] Replay failed:", e)
+            if self._stop.wait(self.replay_interval):
+                return
+
+    # ---------- Inclusion proofs ----------
+    def prove(self, record_id):
+        """The stored record with its Merkle audit path and the batch it was anchored in, or None."""
+        if self.store is None:
+            return None
+        batch = self.store.batch_for_record(record_id)
+        if batch is None:
+            return None
+        index = next(i for i, e in enumerate(batch["records"]) if e["id"] == record_id)
+        leaves = [bytes.fromhex(leaf) for leaf in batch["leaves"]]
+        return {
+            "record": batch["records"][index],
+            "batch_id": batch["batch_id"],
+            "root": batch["root"],
+            "index": index,
+            "proof": [{"sibling": s.hex(), "left": is_left} for s, is_left in merkle_proof(leaves, index)],
+            "status": batch["status"],
+            "tx_hash": batch["tx_hash"],
+            "block_number": batch["block_number"],
+        }
+
+    def anchored_at(self, root_hex):
+        """Block timestamp the contract recorded for this root (0 = never anchored)."""
+        return self.contract.functions.anchoredAt(bytes.fromhex(root_hex)).call()
+
+    def verify(self, record, proof, root_hex, check_chain=True):
+        """
+        Check that `record` (as returned by prove) hashes up to root_hex through
+        `proof`, and optionally that the contract has that root anchored.
+        """
+        path = [(bytes.fromhex(p["sibling"]), p["left"]) for p in proof]
+        included = verify_proof(record_leaf(record), path, bytes.fromhex(root_hex))
+        result = {"included": included, "anchored_at": None}
+        if included and check_chain:
+            try:
+                result["anchored_at"] = self.anchored_at(root_hex) or None
+            except Exception as e:
+                result["chain_error"] = str(e)
+        result["verified"] = included and (not check_chain or result["anchored_at"] is not None)
+        return result
+
+    # ---------- Lifecycle ----------
+    def start(self):
+        if self._threads:
+            return
+        # One sender per account keeps every signer busy; anchoring stays on one so windows aren't split
+        senders = 1 if self.mode == "anchor" else len(self.signers)
+        self._senders_running = senders
+        targets = [(self._sender_loop, f"audit-sender-{i}") for i in range(senders)]
+        if self.journal is not None:
+            targets.append((self._replay_loop, "audit-replay"))
+        for target, name in targets + [(self._receipt_loop, "audit-receipts")]:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=30.0):
+        """Drain: the threads exit once everything queued has been sent and confirmed (or timeout)."""
+        self._stop.set()
+        deadline = time.time() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.time()))
+
+    def flush(self, timeout=30.0):
+        """Wait until the queue is empty and every sent transaction has a receipt."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self._lock:
+                idle = self._queue.unfinished_tasks == 0 and not self._inflight and not self._retry
+            if idle:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def stats(self):
+        def pct(samples, q):
+            if not samples:
+                return None
+            ordered = sorted(samples)
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+        with self._lock:
+            queue_lag, confirm_lag = list(self._queue_lag), list(self._confirm_lag)
+            oldest = None
+            if self._inflight:
+                oldest = round((time.time() - self._oldest(self._inflight[0][1])) * 1000, 2)
+            return {
+                "mode": self.mode,
+                "encoding": self.encoding,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "max_depth_seen": self.max_depth_seen,
+                "inflight": len(self._inflight),
+                "max_inflight": self.max_inflight,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "deferred": self.deferred,
+                "replayed": self.replayed,
+                "sent": self.sent,
+                "confirmed": self.confirmed,
+                "reverted": self.reverted,
+                "failed": self.failed,
+                "records_confirmed": self.records_confirmed,
+                "records_stored": self.store.count() if self.store else None,
+                "gas_used_total": self.gas_used_total,
+                "avg_gas_per_tx": round(self.gas_used_total / self.confirmed, 2) if self.confirmed else None,
+                "avg_gas_per_record": (round(self.gas_used_total / self.records_confirmed, 2)
+                                       if self.records_confirmed else None),
+                "queue_lag_ms_p50": pct(queue_lag, 0.5),
+                "queue_lag_ms_p95": pct(queue_lag, 0.95),
+                "confirm_lag_ms_p50": pct(confirm_lag, 0.5),
+                "confirm_lag_ms_p95": pct(confirm_lag, 0.95),
+                "oldest_unconfirmed_ms": oldest,
+                "signers": self.signers.stats(),
+                "journal": self.journal.stats() if self.journal else None,
+            }
@@ -0,0 +1,57 @@
+# backend/components/audit_encoding.py
+"""
+Fixed-size encoding of audit records for AccessLogV2.
+
+v1 sends five dynamic strings, so gas grows with the username and reason.
+v2 sends 32 + 16 + 1 + 1 + 32 bytes whatever the record contains:
+    userHash   sha256("user:" + username)
+    fileId     the file's UUID as bytes16 (zero for "N/A" and non-UUID ids)
+    action     uint8 code from ACTION_CODES
+    granted    bool
+    reasonHash sha256("reason:" + reason)
+The plaintext record stays in the local store; anyone holding it can
+recompute the hashes and match the on-chain event.
+"""
+import hashlib
+import uuid
+
+ACTION_CODES = {
+    "REGISTER_USER": 1,
+    "REGISTER_USER_BATCH": 2,
+    "UPLOAD": 3,
+    "DOWNLOAD": 4,
+    "ROTATE_MASTER_KEYS": 5,
+}
+OTHER_ACTION = 255
+
+NO_FILE = bytes(16)
+
+
+def hash_username(username: str) -> bytes:
+    return hashlib.sha256(b"user:" + username.encode()).digest()
+
+
+def hash_reason(reason: str) -> bytes:
+    return hashlib.sha256(b"reason:" + reason.encode()).digest()
+
+
+def encode_file_id(file_id: str) -> bytes:
+    try:
+        return uuid.UUID(file_id).bytes
+    except (ValueError, TypeError, AttributeError):
+        return NO_FILE
+
+
+def encode_action(action: str) -> int:
+    return ACTION_CODES.get(action, OTHER_ACTION)
+
+
+def encode_record(username, file_id, action, granted, reason):
+    """Arguments for AccessLogV2.logAccess, in order."""
+    return (
+        hash_username(username),
+        encode_file_id(file_id),
+        encode_action(action),
+        bool(granted),
+        hash_reason(reason),
+    )
@@ -0,0 +1,138 @@
+# backend/components/audit_journal.py
+import json
+import os
+import threading
+
+
+class AuditJournal:
+    """
+    Append-only write-ahead log of audit records (JSON lines).
+
+    append() returns once the record's line is fsynced. One writer thread
+    does the writes, and every line queued while an fsync is running goes
+    out in the next one, so concurrent requests share a disk flush (group
+    commit) instead of paying one each. mark_done() appends a "done" line
+    for records the chain has confirmed. Whatever has no "done" line yet
+    is pending and gets replayed. Confirmed records are compacted away on
+    open and every compact_after "done" lines.
+    """
+
+    def __init__(self, path, compact_after=10000):
+        self.path = path
+        self.compact_after = compact_after
+        self._cond = threading.Condition()
+        self._buffer = []
+        self._appended = 0
+        self._durable = 0
+        self._pending = {}
+        self._done_since_compact = 0
+        self._closed = False
+        self.fsyncs = 0
+        self.lines_written = 0
+        self.torn_lines = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self._compact()
+        self._thread = threading.Thread(target=self._writer, name="audit-journal", daemon=True)
+        self._thread.start()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    # A crash mid-write leaves at most a torn last line; its append() never returned
+                    self.torn_lines += 1
+                    continue
+                if op["op"] == "add":
+                    self._pending[op["entry"]["id"]] = op["entry"]
+                else:
+                    for record_id in op["ids"]:
+                        self._pending.pop(record_id, None)
+
+    def _compact(self):
+        """Rewrite the journal with only the pending records (writer thread or __init__ only)."""
+        with self._cond:
+            entries = list(self._pending.values())
+            self._done_since_compact = 0
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            for entry in entries:
+                f.write(json.dumps({"op": "add", "entry": entry}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "a")
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closed:
+                    self._cond.wait()
+                if not self._buffer:
+                    return
+                lines, self._buffer = self._buffer, []
+                seq = self._appended
+            self._file.write("".join(lines))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            with self._cond:
+                self._durable = seq
+                self.fsyncs += 1
+                self.lines_written += len(lines)
+                self._cond.notify_all()
+                compact = self._done_since_compact >= self.compact_after
+            if compact:
+                self._file.close()
+                self._compact()
+
+    def _queue_line(self, op):
+        self._buffer.append(json.dumps(op) + "\n")
+        self._appended += 1
+        self._cond.notify_all()
+        return self._appended
+
+    def append(self, entry):
+        """Durably record one audit entry (must carry an "id"); blocks until it is on disk."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("audit journal is closed")
+            self._pending[entry["id"]] = entry
+            seq = self._queue_line({"op": "add", "entry": entry})
+            while self._durable < seq:
+                self._cond.wait()
+
+    def mark_done(self, record_ids):
+        """Mark records as confirmed on chain; doesn't wait for the disk, a lost mark only means a replay."""
+        with self._cond:
+            record_ids = [r for r in record_ids if self._pending.pop(r, None) is not None]
+            if record_ids:
+                self._done_since_compact += len(record_ids)
+                self._queue_line({"op": "done", "ids": record_ids})
+
+    def pending(self):
+        with self._cond:
+            return list(self._pending.values())
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._file.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "path": self.path,
+                "pending": len(self._pending),
+                "fsyncs": self.fsyncs,
+                "lines_written": self.lines_written,
+                "lines_per_fsync": round(self.lines_written / self.fsyncs, 2) if self.fsyncs else None,
+                "torn_lines_skipped": self.torn_lines,
+            }
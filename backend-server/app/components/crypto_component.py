@@ -1,20 +1,123 @@
 import os
+import re
 import base64
+import io
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict, deque
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Any, Dict
-from Crypto.Cipher import AES
+from Crypto.Cipher import AES, ChaCha20_Poly1305
 from Crypto.Random import get_random_bytes
+from Crypto.Protocol.KDF import HKDF
+from Crypto.Hash import SHA256
 import oqs
 import json
 
+from .abe_backends import make_abe_backend
+from .merkle import leaf_hash, merkle_root
+
+try:
+    # AES-GCM-SIV is not in PyCryptodome; the suite is offered only when this imports
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCMSIV
+    from cryptography.exceptions import InvalidTag
+except Exception:
+    AESGCMSIV = None
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
 try:
-    from charm.toolbox.pairinggroup import PairingGroup, GT
-    from charm.schemes.abenc.waters11 import Waters11
+    from charm.toolbox.pairinggroup import PairingGroup, GT, ZR, pair
     from charm.core.engine.util import objectToBytes, bytesToObject
+    from charm.toolbox.node import OpType
 except Exception as e:
     PairingGroup = None
-    Waters11 = None
 
 # -------------------- Helpers --------------------
+# Streaming format ("stream-v1"):
+#   header v1 = MAGIC(4) | version=1(1) | chunk_size(4) | nonce_prefix(8)
+#   header v2 = MAGIC(4) | version=2(1) | suite_id(1) | chunk_size(4) | nonce_prefix(8)
+#   header v3 = MAGIC(4) | version=3(1) | suite_id(1) | codec(1) | chunk_size(4) | nonce_prefix(8)
+#   frame     = length(4) | ciphertext | tag(16)
+# Each frame uses nonce = nonce_prefix | frame_index and authenticates the
+# header plus a "final" flag, so reordered, dropped or truncated frames fail.
+# v1 headers carry no suite and are always AES-256-GCM; v1/v2 are never compressed.
+# With a codec, each frame's plaintext is marker(1) | data, where marker 1 means
+# the chunk was compressed and 0 means it is stored as is (it did not shrink).
+STREAM_MAGIC = b"SCF1"
+STREAM_VERSION = 1
+STREAM_VERSION_SUITE = 2
+STREAM_VERSION_CODEC = 3
+STREAM_CHUNK_SIZE = 1024 * 1024
+STREAM_TAG_SIZE = 16
+_STREAM_HEADER = struct.Struct(">4sBI8s")
+_STREAM_HEADER_V2 = struct.Struct(">4sBBI8s")
+_STREAM_HEADER_V3 = struct.Struct(">4sBBBI8s")
+_STREAM_PREFIX = struct.Struct(">4sB")
+_FRAME_LEN = struct.Struct(">I")
+
+# Compression codecs for file bodies (0 = none). The first chunk is test
+# compressed and the file is stored uncompressed unless it saves at least
+# COMPRESSION_MIN_SAVING, so media and archives cost one sample, not a full pass.
+CODEC_NONE = 0
+COMPRESSION_CODECS = {"zlib": 1, "zstd": 2}
+_CODEC_NAMES = {codec: name for name, codec in COMPRESSION_CODECS.items()}
+COMPRESSION_MIN_SAVING = 0.10
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Files at least this large are sealed/opened segment-parallel across cores
+PARALLEL_MIN_SIZE = 8 * STREAM_CHUNK_SIZE
+
+# Binary abe_ct envelope (v2):
+#   MAGIC(3) | version(1) | flags(1) | scheme | policy | plaintext | random_msg
+#   | scheme element fields | attr_count(2) | attr_count * (attr | per-attr fields)
+# Every field is u16 length-prefixed; group elements are a type byte followed
+# by the raw (optionally point-compressed) element bytes. The element and
+# per-attribute fields come from the scheme backend (Waters11: c0, c_m / C, D).
+# v1 is the same without the scheme field and is always Waters11.
+ABE_ENVELOPE_MAGIC = b"ABE"
+ABE_ENVELOPE_VERSION = 2
+ABE_FLAG_COMPRESSED = 0x01
+# Transform ciphertext: the envelope minus plaintext, random_msg and c_m, i.e.
+# only what an untrusted outsourcing worker needs (policy, c0, C, D).
+ABE_TRANSFORM_MAGIC = b"ABT"
+_U16 = struct.Struct(">H")
+
+# Policy compiler: every attribute token is mapped in a single regex pass, so
+# short aliases like 'cs' never rewrite parts of longer tokens.
+_POLICY_ATTR_MAP = {
+    'role:prof': '1', 'ROLE_PROF': '1', 'prof': '1',
+    'role:student': '2', 'ROLE_STUDENT': '2', 'student': '2',
+    'role:admin': '3', 'ROLE_ADMIN': '3', 'admin': '3',
+    'dept:cs': '10', 'DEPT_CS': '10', 'cs': '10',
+    'dept:math': '11', 'DEPT_MATH': '11', 'math': '11',
+    'dept:eng': '12', 'DEPT_ENG': '12', 'eng': '12'
+}
+_POLICY_TOKEN_RE = re.compile(r"[^\s()]+")
+
+# Streaming PQC download envelope:
+#   MAGIC(4) | kem_ct_len(2) | kem_ct | stream-v1 header | stream-v1 frames
+# The frames are sealed with the Kyber768 shared secret exactly like stored
+# files, so the client unwraps chunk by chunk with bounded memory.
+PQC_STREAM_MAGIC = b"PQS1"
+PQC_KEM_ALG = "Kyber768"
+# Session variant: one encapsulation per session, then per-transfer keys via HKDF
+#   MAGIC(4) | session_id(16) | transfer_salt(16) | stream-v1 header | frames
+PQC_SESSION_MAGIC = b"PQSS"
+PQC_SESSION_ID_SIZE = 16
+PQC_TRANSFER_SALT_SIZE = 16
+
+ENC_FORMAT_LEGACY = "gcm"
+ENC_FORMAT_STREAM = "stream-v1"
+
+
 def _aes_encrypt_file(input_path: str, output_path: str, key: bytes):
     """Encrypt a file using AES-GCM."""
     cipher = AES.new(key, AES.MODE_GCM)
@@ -35,26 +138,939 @@ def _aes_decrypt_file(input_path: str, output_path: str, key: bytes):
     with open(output_path, "wb") as f:
         f.write(plaintext)
 
+# -------------------- Cipher Suites --------------------
+# Every suite takes a 32-byte key, a 12-byte nonce and produces a 16-byte tag,
+# so the frame layout is the same whichever one sealed the file.
+def _aes_gcm_seal(key: bytes, nonce: bytes, aad: bytes, data: bytes) -> tuple[bytes, bytes]:
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(aad)
+    return cipher.encrypt_and_digest(data)
+
+def _aes_gcm_open(key: bytes, nonce: bytes, aad: bytes, ciphertext: bytes, tag: bytes) -> bytes:
+    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
+    cipher.update(aad)
+    return cipher.decrypt_and_verify(ciphertext, tag)
+
+def _chacha_seal(key: bytes, nonce: bytes, aad: bytes, data: bytes) -> tuple[bytes, bytes]:
+    cipher = ChaCha20_Poly1305.new(key=key, nonce=nonce)
+    cipher.update(aad)
+    return cipher.encrypt_and_digest(data)
+
+def _chacha_open(key: bytes, nonce: bytes, aad: bytes, ciphertext: bytes, tag: bytes) -> bytes:
+    cipher = ChaCha20_Poly1305.new(key=key, nonce=nonce)
+    cipher.update(aad)
+    return cipher.decrypt_and_verify(ciphertext, tag)
+
+def _gcm_siv_seal(key: bytes, nonce: bytes, aad: bytes, data: bytes) -> tuple[bytes, bytes]:
+    sealed = AESGCMSIV(key).encrypt(nonce, data, aad)
+    return sealed[:-STREAM_TAG_SIZE], sealed[-STREAM_TAG_SIZE:]
+
+def _gcm_siv_open(key: bytes, nonce: bytes, aad: bytes, ciphertext: bytes, tag: bytes) -> bytes:
+    try:
+        return AESGCMSIV(key).decrypt(nonce, ciphertext + tag, aad)
+    except InvalidTag:
+        raise ValueError("MAC check failed")
+
+class CipherSuite:
+    """An AEAD usable for stream frames, identified on disk by suite_id."""
+
+    def __init__(self, suite_id: int, name: str, seal, open_, available: bool = True):
+        self.suite_id = suite_id
+        self.name = name
+        self.seal = seal
+        self.open = open_
+        self.available = available
+
+CIPHER_SUITES = {
+    "aes-gcm": CipherSuite(1, "aes-gcm", _aes_gcm_seal, _aes_gcm_open),
+    "chacha20-poly1305": CipherSuite(2, "chacha20-poly1305", _chacha_seal, _chacha_open),
+    "aes-gcm-siv": CipherSuite(3, "aes-gcm-siv", _gcm_siv_seal, _gcm_siv_open, available=AESGCMSIV is not None),
+}
+_SUITES_BY_ID = {suite.suite_id: suite for suite in CIPHER_SUITES.values()}
+DEFAULT_CIPHER_SUITE = CIPHER_SUITES["aes-gcm"]
+
+def get_cipher_suite(name: str) -> CipherSuite:
+    suite = CIPHER_SUITES.get(name)
+    if suite is None:
+        raise ValueError(f"Unknown cipher suite '{name}' (choose from {', '.join(CIPHER_SUITES)})")
+    if not suite.available:
+        raise RuntimeError(f"Cipher suite '{name}' needs the 'cryptography' package")
+    return suite
+
+def benchmark_cipher_suites(size: int = STREAM_CHUNK_SIZE, rounds: int = 3) -> Dict[str, float]:
+    """Seal and open `size` bytes with each available suite; best-of-rounds MB/s per suite."""
+    key, nonce, aad = get_random_bytes(32), get_random_bytes(12), get_random_bytes(_STREAM_HEADER_V2.size + 1)
+    data = get_random_bytes(size)
+    results = {}
+    for suite in CIPHER_SUITES.values():
+        if not suite.available:
+            continue
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            suite.open(key, nonce, aad, *suite.seal(key, nonce, aad, data))
+            best = min(best, time.perf_counter() - start)
+        results[suite.name] = round(size / (1024 * 1024) / best, 2)
+    return results
+
+# -------------------- Compression --------------------
+def get_compression_codec(name: str) -> int:
+    """Codec id for a name; "auto" is zstd when installed, else zlib; "none" disables."""
+    if name == "none":
+        return CODEC_NONE
+    if name == "auto":
+        name = "zstd" if zstandard is not None else "zlib"
+    if name not in COMPRESSION_CODECS:
+        raise ValueError(f"Unknown compression codec '{name}' (choose from auto, none, {', '.join(COMPRESSION_CODECS)})")
+    if name == "zstd" and zstandard is None:
+        raise RuntimeError("zstd compression needs the 'zstandard' package")
+    return COMPRESSION_CODECS[name]
+
+def _compress(codec: int, data: bytes) -> bytes:
+    if codec == COMPRESSION_CODECS["zstd"]:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+def _decompress(codec: int, data: bytes, limit: int) -> bytes:
+    """Decompress one frame, refusing to produce more than limit bytes."""
+    if codec == COMPRESSION_CODECS["zstd"]:
+        if zstandard is None:
+            raise RuntimeError("Encrypted stream is zstd compressed; install the 'zstandard' package")
+        try:
+            plain = zstandard.ZstdDecompressor().decompress(data, max_output_size=limit)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Compressed frame is malformed or exceeds chunk size: {e}")
+    elif codec == COMPRESSION_CODECS["zlib"]:
+        decomp = zlib.decompressobj()
+        plain = decomp.decompress(data, limit)
+        if decomp.unconsumed_tail or not decomp.eof:
+            raise ValueError("Compressed frame is malformed or exceeds chunk size")
+    else:
+        raise ValueError(f"Encrypted stream uses unknown compression codec {codec}")
+    if len(plain) > limit:
+        raise ValueError("Compressed frame exceeds chunk size")
+    return plain
+
+def _sample_codec(codec: int, sample: bytes) -> int:
+    """Keep codec only if it shrinks the sample by at least COMPRESSION_MIN_SAVING."""
+    if codec == CODEC_NONE or not sample:
+        return CODEC_NONE
+    saving = 1 - len(_compress(codec, sample)) / len(sample)
+    return codec if saving >= COMPRESSION_MIN_SAVING else CODEC_NONE
+
+def _pack_frame_plain(codec: int, chunk: bytes) -> bytes:
+    if codec == CODEC_NONE:
+        return chunk
+    packed = _compress(codec, chunk)
+    return b"\x01" + packed if len(packed) < len(chunk) else b"\x00" + chunk
+
+def _unpack_frame_plain(codec: int, plain: bytes, chunk_size: int) -> bytes:
+    if codec == CODEC_NONE:
+        return plain
+    if not plain:
+        raise ValueError("Compressed stream frame is missing its marker")
+    if plain[0] == 1:
+        return _decompress(codec, plain[1:], chunk_size)
+    return plain[1:]
+
+# -------------------- Stream Frames --------------------
+def _frame_nonce_aad(header: bytes, index: int, final: bool) -> tuple[bytes, bytes]:
+    """Nonce and AAD for one frame, bound to its position and the header."""
+    return header[-8:] + struct.pack(">I", index), header + (b"\x01" if final else b"\x00")
+
+def _encrypt_frame(suite: CipherSuite, key: bytes, header: bytes, index: int, final: bool, chunk: bytes,
+                   codec: int = CODEC_NONE) -> bytes:
+    plain = _pack_frame_plain(codec, chunk)
+    ciphertext, tag = suite.seal(key, *_frame_nonce_aad(header, index, final), plain)
+    return _FRAME_LEN.pack(len(ciphertext)) + ciphertext + tag
+
+def _decrypt_frame(suite: CipherSuite, key: bytes, header: bytes, index: int, final: bool,
+                   ciphertext: bytes, tag: bytes, codec: int = CODEC_NONE, chunk_size: int = 0) -> bytes:
+    try:
+        plain = suite.open(key, *_frame_nonce_aad(header, index, final), ciphertext, tag)
+    except ValueError:
+        raise ValueError(f"Stream frame {index} failed authentication")
+    return _unpack_frame_plain(codec, plain, chunk_size)
+
+def _new_stream_header(chunk_size: int, suite: CipherSuite | None = None, codec: int = CODEC_NONE) -> bytes:
+    """v3 header naming suite and codec; without a suite, the v1 (AES-GCM) header PQC clients read."""
+    if suite is None:
+        return _STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, chunk_size, get_random_bytes(8))
+    return _STREAM_HEADER_V3.pack(STREAM_MAGIC, STREAM_VERSION_CODEC, suite.suite_id, codec,
+                                  chunk_size, get_random_bytes(8))
+
+def _header_codec(header: bytes) -> int:
+    return header[6] if header[4] == STREAM_VERSION_CODEC else CODEC_NONE
+
+def _read_stream_header(f) -> tuple[bytes, int, CipherSuite, int]:
+    """Read and check a stream header; returns (header, chunk_size, suite, codec)."""
+    prefix = f.read(_STREAM_PREFIX.size)
+    if len(prefix) != _STREAM_PREFIX.size:
+        raise ValueError("Encrypted stream is truncated (missing header)")
+    magic, version = _STREAM_PREFIX.unpack(prefix)
+    layouts = {STREAM_VERSION: _STREAM_HEADER, STREAM_VERSION_SUITE: _STREAM_HEADER_V2,
+               STREAM_VERSION_CODEC: _STREAM_HEADER_V3}
+    if magic != STREAM_MAGIC or version not in layouts:
+        raise ValueError("Not a supported encrypted stream")
+    layout = layouts[version]
+    header = prefix + f.read(layout.size - _STREAM_PREFIX.size)
+    if len(header) != layout.size:
+        raise ValueError("Encrypted stream is truncated (missing header)")
+    codec = CODEC_NONE
+    if version == STREAM_VERSION:
+        _, _, chunk_size, _ = layout.unpack(header)
+        return header, chunk_size, DEFAULT_CIPHER_SUITE, codec
+    if version == STREAM_VERSION_SUITE:
+        _, _, suite_id, chunk_size, _ = layout.unpack(header)
+    else:
+        _, _, suite_id, codec, chunk_size, _ = layout.unpack(header)
+        if codec != CODEC_NONE and codec not in _CODEC_NAMES:
+            raise ValueError(f"Encrypted stream uses unknown compression codec {codec}")
+    suite = _SUITES_BY_ID.get(suite_id)
+    if suite is None:
+        raise ValueError(f"Encrypted stream uses unknown cipher suite {suite_id}")
+    if not suite.available:
+        raise RuntimeError(f"Encrypted stream uses '{suite.name}', which needs the 'cryptography' package")
+    return header, chunk_size, suite, codec
+
+def _iter_stream_frames(f, chunk_size: int, codec: int = CODEC_NONE):
+    """Yield (index, ciphertext, tag, final) for each frame, reading one frame ahead.
+
+    The final flag is not stored; a frame is final when it is the last one in
+    the file, and that flag is authenticated, so cutting the stream at a frame
+    boundary is detected when the new last frame fails to verify.
+    """
+    # Compressed streams add a one-byte marker to each frame
+    max_length = chunk_size + (1 if codec != CODEC_NONE else 0)
+
+    def read_frame():
+        raw_len = f.read(_FRAME_LEN.size)
+        if not raw_len:
+            return None
+        if len(raw_len) != _FRAME_LEN.size:
+            raise ValueError("Encrypted stream is truncated")
+        (length,) = _FRAME_LEN.unpack(raw_len)
+        if length > max_length:
+            raise ValueError("Encrypted stream frame exceeds chunk size")
+        body = f.read(length + STREAM_TAG_SIZE)
+        if len(body) != length + STREAM_TAG_SIZE:
+            raise ValueError("Encrypted stream is truncated")
+        return body[:length], body[length:]
+
+    current = read_frame()
+    if current is None:
+        raise ValueError("Encrypted stream has no frames")
+    index = 0
+    while current is not None:
+        nxt = read_frame()
+        yield index, current[0], current[1], nxt is None
+        current = nxt
+        index += 1
+
+def _aes_encrypt_file_stream(input_path: str, output_path: str, key: bytes, chunk_size: int = STREAM_CHUNK_SIZE,
+                             suite: CipherSuite | None = None, codec: int = CODEC_NONE,
+                             indexer: "_StreamIndexer | None" = None) -> int:
+    """Encrypt a file chunk by chunk with the given suite, holding at most two chunks in memory.
+
+    Returns the codec actually used (CODEC_NONE if the first chunk did not compress).
+    """
+    with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+        pieces = _seal_stream(src, key, chunk_size, suite, codec)
+        header = next(pieces)
+        _write_piece(dst, header, indexer)
+        for piece in pieces:
+            _write_piece(dst, piece, indexer)
+    return _header_codec(header)
+
+def _aes_decrypt_file_stream(input_path: str, output_path: str, key: bytes):
+    """Decrypt a stream-v1 file frame by frame; the output is removed if any frame fails."""
+    try:
+        with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+            header, chunk_size, suite, codec = _read_stream_header(src)
+            for index, ciphertext, tag, final in _iter_stream_frames(src, chunk_size, codec):
+                dst.write(_decrypt_frame(suite, key, header, index, final, ciphertext, tag, codec, chunk_size))
+    except Exception:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+def _seal_stream(src, key: bytes, chunk_size: int = STREAM_CHUNK_SIZE, suite: CipherSuite | None = None,
+                 codec: int = CODEC_NONE):
+    """Yield a stream-v1 header and frames for everything readable from src.
+
+    codec is only honoured with an explicit suite (v1 headers cannot carry it)
+    and only if the first chunk compresses well enough.
+    """
+    chunk = src.read(chunk_size)
+    codec = _sample_codec(codec, chunk) if suite is not None else CODEC_NONE
+    header = _new_stream_header(chunk_size, suite, codec)
+    suite = suite or DEFAULT_CIPHER_SUITE
+    yield header
+    index = 0
+    while True:
+        nxt = src.read(chunk_size) if len(chunk) == chunk_size else b""
+        final = not nxt
+        yield _encrypt_frame(suite, key, header, index, final, chunk, codec)
+        if final:
+            return
+        chunk = nxt
+        index += 1
+
+def _write_piece(dst, piece: bytes, indexer: "_StreamIndexer | None"):
+    dst.write(piece)
+    if indexer is not None:
+        indexer.add(piece)
+
+def _drain_in_order(pending: deque, dst, limit: int, indexer: "_StreamIndexer | None" = None):
+    """Write finished segments in order until at most `limit` are in flight."""
+    while len(pending) > limit:
+        _write_piece(dst, pending.popleft().result(), indexer)
+
+def _aes_encrypt_file_parallel(input_path: str, output_path: str, key: bytes,
+                               pool: ThreadPoolExecutor, workers: int,
+                               chunk_size: int = STREAM_CHUNK_SIZE,
+                               suite: CipherSuite = DEFAULT_CIPHER_SUITE, codec: int = CODEC_NONE,
+                               indexer: "_StreamIndexer | None" = None) -> int:
+    """Encrypt a file into the stream-v1 layout with segments sealed on a thread pool.
+
+    Every segment has its own nonce, so they are independent; AES-GCM in
+    PyCryptodome releases the GIL, so threads give real multi-core throughput.
+    At most 2 * workers segments are held in memory at a time. Compression,
+    when the first chunk qualifies, also runs on the pool. Returns the codec used.
+    """
+    pending: deque = deque()
+    with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+        chunk = src.read(chunk_size)
+        codec = _sample_codec(codec, chunk)
+        header = _new_stream_header(chunk_size, suite, codec)
+        _write_piece(dst, header, indexer)
+        index = 0
+        while True:
+            nxt = src.read(chunk_size) if len(chunk) == chunk_size else b""
+            final = not nxt
+            pending.append(pool.submit(_encrypt_frame, suite, key, header, index, final, chunk, codec))
+            _drain_in_order(pending, dst, 2 * workers, indexer)
+            if final:
+                break
+            chunk = nxt
+            index += 1
+        _drain_in_order(pending, dst, 0, indexer)
+    return codec
+
+def _aes_decrypt_file_parallel(input_path: str, output_path: str, key: bytes,
+                               pool: ThreadPoolExecutor, workers: int):
+    """Decrypt a stream-v1 file with segments opened on a thread pool."""
+    pending: deque = deque()
+    try:
+        with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+            header, chunk_size, suite, codec = _read_stream_header(src)
+            for index, ciphertext, tag, final in _iter_stream_frames(src, chunk_size, codec):
+                pending.append(pool.submit(_decrypt_frame, suite, key, header, index, final,
+                                           ciphertext, tag, codec, chunk_size))
+                _drain_in_order(pending, dst, 2 * workers)
+            _drain_in_order(pending, dst, 0)
+    except Exception:
+        for fut in pending:
+            fut.cancel()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+# -------------------- Seekable Access --------------------
+# Chunk index of a stream file: {"header": hex, "frame_offsets": [...],
+# "enc_size": int, "plain_size": int}. Every frame but the last holds exactly
+# chunk_size plaintext bytes, so plain offset -> frame number is a division
+# and frame number -> ciphertext offset is a lookup; a byte range maps to one
+# contiguous ciphertext range.
+#
+# Chunk Merkle tree beside it, {"alg", "root", "leaves"}: leaf i is
+# leaf_hash(frame i as stored, i.e. length | ciphertext | tag). Frames can be
+# checked one by one, in any order, without the key.
+#
+# Both are built while the frames are written. The per-frame lists go into a
+# JSON sidecar object stored next to the ciphertext; file metadata keeps only
+# the header, sizes, frame count and root, and expand_stream_index() puts the
+# two back together (checking the sidecar against the root).
+class _StreamIndexer:
+    """Collects offsets and Merkle leaves from the pieces of a stream file as they are written."""
+
+    def __init__(self):
+        self.header = b""
+        self.offsets: list[int] = []
+        self.leaves: list[bytes] = []
+        self.size = 0
+
+    def add(self, piece: bytes):
+        # The header is written first, then exactly one frame per piece
+        if not self.header:
+            self.header = piece
+        else:
+            self.offsets.append(self.size)
+            self.leaves.append(leaf_hash(piece))
+        self.size += len(piece)
+
+    def metadata(self, plain_size: int) -> tuple[Dict[str, Any], Dict[str, Any]]:
+        """(chunk_index, merkle) summaries for file metadata, without the per-frame lists."""
+        index = {"header": self.header.hex(), "frames": len(self.offsets),
+                 "enc_size": self.size, "plain_size": plain_size}
+        return index, {"alg": "sha256", "root": merkle_root(self.leaves).hex()}
+
+    def write_sidecar(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"frame_offsets": self.offsets, "leaves": [leaf.hex() for leaf in self.leaves]}, f)
+
+def _expand_stream_index(index: Dict[str, Any], merkle: Dict[str, Any],
+                         sidecar: bytes | None) -> tuple[Dict[str, Any], Dict[str, Any]]:
+    """Full index and tree from the metadata summaries and the sidecar object's bytes."""
+    if "frame_offsets" in index:
+        # Files indexed before sidecars carry the lists inline
+        return index, merkle
+    if sidecar is None:
+        raise ValueError("Chunk index sidecar is missing")
+    lists = json.loads(sidecar)
+    leaves = [bytes.fromhex(leaf) for leaf in lists["leaves"]]
+    if len(leaves) != index["frames"] or len(lists["frame_offsets"]) != index["frames"]:
+        raise ValueError("Chunk index sidecar does not match the file's frame count")
+    if merkle_root(leaves).hex() != merkle["root"]:
+        raise ValueError("Chunk index sidecar does not match the file's Merkle root")
+    return ({**index, "frame_offsets": lists["frame_offsets"]},
+            {**merkle, "leaves": lists["leaves"]})
+
+def _read_full(src, n: int) -> bytes:
+    """Read exactly n bytes from a file-like (e.g. an S3 body), fewer only at EOF."""
+    buf = bytearray()
+    while len(buf) < n:
+        piece = src.read(n - len(buf))
+        if not piece:
+            break
+        buf += piece
+    return bytes(buf)
+
+def _read_raw_frame(src, max_length: int) -> bytes | None:
+    """One stored frame (length | ciphertext | tag) from src, or None at EOF."""
+    raw_len = _read_full(src, _FRAME_LEN.size)
+    if not raw_len:
+        return None
+    if len(raw_len) != _FRAME_LEN.size:
+        raise ValueError("Encrypted stream is truncated")
+    (length,) = _FRAME_LEN.unpack(raw_len)
+    if length > max_length:
+        raise ValueError("Encrypted stream frame exceeds chunk size")
+    body = _read_full(src, length + STREAM_TAG_SIZE)
+    if len(body) != length + STREAM_TAG_SIZE:
+        raise ValueError("Encrypted stream is truncated")
+    return raw_len + body
+
+def _verify_stream_object(index: Dict[str, Any], merkle: Dict[str, Any], src) -> Dict[str, Any]:
+    """Check a whole stored object against its chunk tree without decrypting it.
+
+    Frames are cut at the indexed offsets rather than at their own length
+    prefixes, so one corrupted prefix cannot misalign the chunks after it.
+    Returns {"ok", "header_ok", "root_ok", "bad_chunks", "missing_chunks", "trailing_bytes"}.
+    """
+    header = bytes.fromhex(index["header"])
+    leaves = [bytes.fromhex(leaf) for leaf in merkle["leaves"]]
+    bounds = index["frame_offsets"] + [index["enc_size"]]
+    if len(leaves) != len(index["frame_offsets"]):
+        raise ValueError("Chunk index and Merkle tree disagree on the number of chunks")
+    result = {
+        "header_ok": _read_full(src, len(header)) == header,
+        "root_ok": merkle_root(leaves).hex() == merkle["root"],
+        "bad_chunks": [],
+        "missing_chunks": 0,
+        "trailing_bytes": False,
+    }
+    for i, leaf in enumerate(leaves):
+        size = bounds[i + 1] - bounds[i]
+        frame = _read_full(src, size)
+        if len(frame) != size:
+            result["missing_chunks"] = len(leaves) - i
+            break
+        if leaf_hash(frame) != leaf:
+            result["bad_chunks"].append(i)
+    else:
+        result["trailing_bytes"] = bool(src.read(1))
+    result["ok"] = (result["header_ok"] and result["root_ok"] and not result["bad_chunks"]
+                    and not result["missing_chunks"] and not result["trailing_bytes"])
+    return result
+
+def _plan_stream_range(index: Dict[str, Any], start: int, stop: int) -> Dict[str, int]:
+    """Frames and the inclusive ciphertext byte range covering plaintext [start, stop)."""
+    if not 0 <= start < stop <= index["plain_size"]:
+        raise ValueError("Requested range is outside the file")
+    header = bytes.fromhex(index["header"])
+    chunk_size = _read_stream_header(io.BytesIO(header))[1]
+    offsets = index["frame_offsets"]
+    first, last = start // chunk_size, (stop - 1) // chunk_size
+    ct_end = offsets[last + 1] if last + 1 < len(offsets) else index["enc_size"]
+    return {"start": start, "stop": stop, "first_frame": first, "last_frame": last,
+            "ct_start": offsets[first], "ct_end": ct_end - 1}
+
+def _decrypt_stream_range(index: Dict[str, Any], key: bytes, src, plan: Dict[str, int],
+                          merkle: Dict[str, Any] | None = None):
+    """Yield the plaintext for plan from src, which holds exactly its ciphertext range.
+
+    Each frame is authenticated with its real position and final flag, so a
+    ranged read is checked exactly as strictly as a full decryption. With the
+    chunk tree, a frame that no longer matches its leaf is reported as a
+    corrupt stored chunk before any decryption is attempted.
+    """
+    header = bytes.fromhex(index["header"])
+    _, chunk_size, suite, codec = _read_stream_header(io.BytesIO(header))
+    last_index = len(index["frame_offsets"]) - 1
+    for frame in range(plan["first_frame"], plan["last_frame"] + 1):
+        raw = _read_raw_frame(src, chunk_size + (1 if codec != CODEC_NONE else 0))
+        if raw is None:
+            raise ValueError("Encrypted range is truncated")
+        if merkle is not None and leaf_hash(raw).hex() != merkle["leaves"][frame]:
+            raise ValueError(f"Stored chunk {frame} does not match its Merkle leaf")
+        length = len(raw) - _FRAME_LEN.size - STREAM_TAG_SIZE
+        body = raw[_FRAME_LEN.size:]
+        plain = _decrypt_frame(suite, key, header, frame, frame == last_index,
+                               body[:length], body[length:], codec, chunk_size)
+        base = frame * chunk_size
+        yield plain[max(plan["start"] - base, 0):plan["stop"] - base]
+
+def _put_field(buf: bytearray, data: bytes):
+    if len(data) > 0xFFFF:
+        raise ValueError("abe_ct field too large for envelope")
+    buf += _U16.pack(len(data))
+    buf += data
+
+class _FieldReader:
+    """Sequential reader for u16 length-prefixed envelope fields."""
+
+    def __init__(self, data: bytes, offset: int = 0):
+        self.data = data
+        self.offset = offset
+
+    def read(self) -> bytes:
+        if self.offset + _U16.size > len(self.data):
+            raise ValueError("abe_ct envelope is truncated")
+        (length,) = _U16.unpack_from(self.data, self.offset)
+        start = self.offset + _U16.size
+        if start + length > len(self.data):
+            raise ValueError("abe_ct envelope is truncated")
+        self.offset = start + length
+        return self.data[start:self.offset]
+
+    def read_u16(self) -> int:
+        if self.offset + _U16.size > len(self.data):
+            raise ValueError("abe_ct envelope is truncated")
+        (value,) = _U16.unpack_from(self.data, self.offset)
+        self.offset += _U16.size
+        return value
+
+def _policy_leaves(node) -> set:
+    """Every attribute named in a parsed policy tree."""
+    if node.getNodeType() == OpType.ATTR:
+        return {node.getAttribute()}
+    return _policy_leaves(node.getLeft()) | _policy_leaves(node.getRight())
+
+def _min_satisfying_leaves(node, attrs: set) -> list[str] | None:
+    """Fewest policy leaves (attribute names) that satisfy node with attrs, or None.
+
+    Plain boolean evaluation of the parsed tree; no group operations. Picking
+    the cheaper branch at each OR keeps the number of pairings in decrypt down.
+    """
+    node_type = node.getNodeType()
+    if node_type == OpType.ATTR:
+        attr = node.getAttribute()
+        return [attr] if attr in attrs else None
+    left = _min_satisfying_leaves(node.getLeft(), attrs)
+    if node_type == OpType.AND:
+        if left is None:
+            return None
+        right = _min_satisfying_leaves(node.getRight(), attrs)
+        return None if right is None else left + right
+    if node_type == OpType.OR:
+        right = _min_satisfying_leaves(node.getRight(), attrs)
+        options = [o for o in (left, right) if o is not None]
+        return min(options, key=len) if options else None
+    raise ValueError(f"Unsupported policy node type: {node_type}")
+
+class _LRUCache:
+    """Thread-safe LRU bounded by entry count and by an approximate byte budget."""
+
+    def __init__(self, max_entries: int, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size: int = 0):
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or
+                                  (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, predicate) -> int:
+        """Drop every entry whose key matches predicate; returns how many were dropped."""
+        with self._lock:
+            stale = [k for k in self._data if predicate(k)]
+            for k in stale:
+                self._bytes -= self._data.pop(k)[1]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+class _CapsulePool:
+    """Background producer of ready-made (GT element, ABE ciphertext) capsules.
+
+    Policies become "hot" once they have been requested hot_threshold times;
+    at most max_policies of the most used ones are kept stocked. Request
+    counts are kept for at most max_tracked policies: past that, every count
+    is halved and the ones that reach zero are forgotten. The producer
+    wakes when a hot pool drops to low_watermark and refills it up to
+    high_watermark. Capsules are tagged with the master key version they were
+    made under and discarded if the keys have changed since.
+    """
+
+    def __init__(self, produce, key_version, high_watermark: int = 8, low_watermark: int = 2,
+                 hot_threshold: int = 3, max_policies: int = 16, max_tracked: int = 1024):
+        if not 0 <= low_watermark < high_watermark:
+            raise ValueError("capsule pool needs 0 <= low_watermark < high_watermark")
+        self._produce = produce
+        self._key_version = key_version
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.hot_threshold = hot_threshold
+        self.max_policies = max_policies
+        self.max_tracked = max_tracked
+
+        self._pools: dict[str, deque] = {}
+        self._usage: Counter = Counter()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopped = False
+
+        self.hits = 0
+        self.misses = 0
+        self.produced = 0
+        self.discarded = 0
+        self.errors = 0
+
+    def _hot_policies(self) -> list[str]:
+        return [p for p, n in self._usage.most_common(self.max_policies) if n >= self.hot_threshold]
+
+    def _decay_usage(self):
+        # Policies come from uploads, so one-off policies must not pile up forever
+        self._usage = Counter({p: n // 2 for p, n in self._usage.most_common(self.max_tracked) if n >= 2})
+        for policy in [p for p in self._pools if p not in self._usage]:
+            del self._pools[policy]
+
+    def _needs_refill(self, policy: str) -> bool:
+        return len(self._pools.get(policy, ())) <= self.low_watermark
+
+    def take(self, policy: str):
+        """Return (random_msg, ct) for policy, or None when the pool has nothing ready."""
+        with self._cond:
+            self._usage[policy] += 1
+            if len(self._usage) > self.max_tracked:
+                self._decay_usage()
+            pool = self._pools.get(policy)
+            capsule = None
+            while pool:
+                version, random_msg, ct = pool.popleft()
+                if version == self._key_version():
+                    capsule = (random_msg, ct)
+                    break
+                self.discarded += 1
+            if capsule:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if policy in self._hot_policies() and self._needs_refill(policy):
+                self._ensure_thread()
+                self._cond.notify()
+            return capsule
+
+    def clear(self):
+        with self._cond:
+            self._pools.clear()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="abe-capsules", daemon=True)
+            self._thread.start()
+
+    def _next_policy(self) -> str | None:
+        for policy in self._hot_policies():
+            if len(self._pools.get(policy, ())) < self.high_watermark:
+                return policy
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                policy = self._next_policy()
+                while policy is None and not self._stopped:
+                    self._cond.wait()
+                    policy = self._next_policy()
+                if self._stopped:
+                    return
+                version = self._key_version()
+            try:
+                random_msg, ct = self._produce(policy)
+            except Exception as e:
+                print(f"Capsule production failed for '{policy}': {e}")
+                with self._cond:
+                    self.errors += 1
+                    # Stop retrying a failing policy until it is requested again
+                    self._usage.pop(policy, None)
+                continue
+            with self._cond:
+                self._pools.setdefault(policy, deque()).append((version, random_msg, ct))
+                self.produced += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "produced": self.produced,
+                "discarded": self.discarded,
+                "errors": self.errors,
+                "hot_policies": self._hot_policies(),
+                "pool_sizes": {p: len(q) for p, q in self._pools.items()},
+            }
+
+# -------------------- Post-Quantum Key Wrapping --------------------
+def _kyber_encapsulate(public_key: bytes) -> tuple[bytes, bytes]:
+    """Encapsulate a fresh shared secret to a client's Kyber768 public key."""
+    with oqs.KeyEncapsulation(PQC_KEM_ALG) as kem:
+        return kem.encap_secret(public_key)
+
+class _PQCSessionStore:
+    """In-memory PQC sessions with a TTL and a cap on transfers per session."""
+
+    def __init__(self, ttl_seconds: int = 900, max_transfers: int = 500):
+        self.ttl_seconds = ttl_seconds
+        self.max_transfers = max_transfers
+        self._sessions: dict[bytes, dict] = {}
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.transfers = 0
+        self.rejected = 0
+
+    def _purge(self, now: float):
+        for sid in [sid for sid, sess in self._sessions.items() if sess["expires"] <= now]:
+            del self._sessions[sid]
+
+    def open(self, session_key: bytes, session_id: bytes, owner: str | None):
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            self._sessions[session_id] = {
+                "key": session_key,
+                "owner": owner,
+                "expires": now + self.ttl_seconds,
+                "transfers_left": self.max_transfers,
+            }
+            self.opened += 1
+
+    def _usable(self, session_id: bytes, owner: str | None) -> dict:
+        sess = self._sessions.get(session_id)
+        if sess is None or sess["expires"] <= time.time():
+            self._sessions.pop(session_id, None)
+            self.rejected += 1
+            raise ValueError("PQC session unknown or expired")
+        if sess["owner"] != owner:
+            self.rejected += 1
+            raise ValueError("PQC session belongs to another user")
+        if sess["transfers_left"] <= 0:
+            del self._sessions[session_id]
+            self.rejected += 1
+            raise ValueError("PQC session transfer limit reached")
+        return sess
+
+    def check(self, session_id: bytes, owner: str | None):
+        """Raise like take_transfer would, without using up a transfer."""
+        with self._lock:
+            self._usable(session_id, owner)
+
+    def take_transfer(self, session_id: bytes, owner: str | None) -> bytes:
+        """Consume one transfer and return the session key, or raise if not allowed."""
+        with self._lock:
+            sess = self._usable(session_id, owner)
+            sess["transfers_left"] -= 1
+            self.transfers += 1
+            return sess["key"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge(time.time())
+            return {"active": len(self._sessions), "opened": self.opened,
+                    "transfers": self.transfers, "rejected": self.rejected}
+
+# -------------------- Crypto Worker Processes --------------------
+# Each worker process owns its own PairingGroup, Waters11 instance and
+# deserialized key set, so pairing math never holds the API process's GIL.
+_worker_crypto = None
+
+def _init_crypto_worker(curve: str, uni_size: int, scheme: str, precompute: bool):
+    global _worker_crypto
+    _worker_crypto = CryptoComponent(curve=curve, uni_size=uni_size, file_workers=1, scheme=scheme,
+                                     precompute=precompute)
+
+def _worker_keygen(keys_name: str, attributes: list[str]) -> str:
+    _worker_crypto.load_master_keys(keys_name)
+    return _worker_crypto.generate_user_secret(attributes)
+
+def _worker_keygen_batch(keys_name: str, attribute_sets: list[list[str]]) -> list[str]:
+    _worker_crypto.load_master_keys(keys_name)
+    return _worker_crypto.generate_user_secrets_batch(attribute_sets)
+
+def _worker_transform(transform_ct: str, tk_b64: str) -> str:
+    return _worker_crypto.transform_decrypt(transform_ct, tk_b64)
+
+def _worker_abe_encrypt(keys_name: str, policy: str, plaintext: str) -> str:
+    _worker_crypto.load_master_keys(keys_name)
+    return _worker_crypto.abe_encrypt_str(policy, plaintext)
+
+def _worker_make_capsule(keys_name: str, normalized_policy: str) -> str:
+    _worker_crypto.load_master_keys(keys_name)
+    random_msg, ct = _worker_crypto._make_capsule(normalized_policy)
+    return _worker_crypto._pack_abe_envelope(ct, random_msg, "", normalized_policy)
+
+def _worker_rewrap(abe_ct: str, from_epoch: int, to_epoch: int) -> str:
+    return _worker_crypto.rewrap_abe_ct(abe_ct, from_epoch, to_epoch)
+
+def _worker_abe_decrypt(keys_name: str, abe_ct: str, user_sk_b64: str, sk_cache_key: tuple | None) -> str:
+    _worker_crypto.load_master_keys(keys_name)
+    return _worker_crypto.abe_decrypt_str(abe_ct, user_sk_b64, sk_cache_key)
+
+def _run_inline(fn, *args) -> Future:
+    """Run fn now and hand back a completed Future, so callers can always .result()."""
+    fut = Future()
+    try:
+        fut.set_result(fn(*args))
+    except Exception as e:
+        fut.set_exception(e)
+    return fut
+
 # -------------------- Crypto Component --------------------
 class CryptoComponent:
-    """Wrapper for Charm CP-ABE (Waters11) with hybrid AES file encryption."""
+    """Wrapper for Charm CP-ABE (Waters11 by default) with hybrid AES file encryption."""
 
-    def __init__(self, curve: str = "SS512", uni_size: int = 100):
-        if PairingGroup is None or Waters11 is None:
+    def __init__(self, curve: str = "SS512", uni_size: int = 100, scheme: str = "waters11",
+                 file_workers: int | None = None,
+                 sk_cache_entries: int = 1024, sk_cache_bytes: int = 16 * 1024 * 1024,
+                 compress_points: bool = True, precompute: bool = False,
+                 policy_cache_entries: int = 512, satisfy_cache_entries: int = 4096,
+                 cipher_suite: str = "aes-gcm", compression: str = "auto"):
+        if PairingGroup is None:
             raise RuntimeError(
                 "Charm-Crypto CP-ABE classes not available. "
                 "Install charm-crypto in your environment (pip install charm-crypto)"
             )
 
+        self.curve = curve
+        self.uni_size = uni_size
+        self.scheme = scheme
         self.group = PairingGroup(curve)
-        self.cpabe = Waters11(self.group, uni_size, verbose=False)
+        self.abe = make_abe_backend(scheme, self.group, uni_size)
+        # Master keys only fit the scheme/curve they were made for
+        self.keys_name = "master" if (scheme, curve) == ("waters11", "SS512") else f"master_{scheme}_{curve}"
+        self.compress_points = compress_points
+        # Build fixed-base exponentiation tables for PK elements on key load. Opt-in per
+        # process: only worth the setup time and memory where keygen/encrypt run.
+        self.precompute = precompute
+        self.precomputed_bases = 0
 
         self._pk_b64: str | None = None
         self._msk_b64: str | None = None
 
+        # Deserialized master keys, reloaded only when the key files change
+        self._pk = None
+        self._msk = None
+        self._keys_stamp: tuple | None = None
+        self._keys_lock = threading.Lock()
+        self.master_key_version = 0
+
+        # CP-ABE process pool, started lazily once configure_worker_pool() is called
+        self._worker_processes = 0
+        self._worker_precompute = False
+        self._worker_keys_name = None  # set below, once the active key epoch is known
+        self._worker_pool: ProcessPoolExecutor | None = None
+        self._worker_pool_lock = threading.Lock()
+
+        # Parsed policy trees keyed by normalized policy string
+        self._policy_cache = _LRUCache(policy_cache_entries)
+        # Minimal satisfying attribute subsets keyed by (attribute set, policy)
+        self._satisfy_cache = _LRUCache(satisfy_cache_entries)
+
+        # Offline/online ABE: enabled with enable_capsule_pool()
+        self.capsule_pool: _CapsulePool | None = None
+
+        # Kyber768 download sessions (see pqc_open_session)
+        self.pqc_sessions = _PQCSessionStore()
+
+        # Deserialized user secret keys keyed by (username, key version)
+        self._sk_cache = _LRUCache(sk_cache_entries, sk_cache_bytes)
+
         self.keys_folder = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "keys"))
         os.makedirs(self.keys_folder, exist_ok=True)
 
+        # Versioned master keys: abe_cts and user SKs record the epoch they belong to
+        self.key_epoch = self._read_key_epochs()["current"]
+        self._worker_keys_name = self._epoch_keys_name(self.key_epoch)
+        self._epoch_keys: Dict[int, tuple] = {}
+
+        # Shared pool for segment-parallel AES on large files
+        self.file_workers = file_workers or os.cpu_count() or 1
+        self._file_pool = ThreadPoolExecutor(max_workers=self.file_workers, thread_name_prefix="aes-seg")
+        # AEAD for new file bodies; select_cipher_suite("auto") benchmarks and picks one
+        self.cipher_suite = get_cipher_suite(cipher_suite)
+        self.cipher_suite_benchmark: Dict[str, float] = {}
+        # Per-chunk compression before encryption, skipped for incompressible uploads
+        self.compression = get_compression_codec(compression)
+        self._compression_counts = Counter()
+        self._compression_lock = threading.Lock()
+
     # ---------- Serialization helpers ----------
     def _b64_obj(self, obj: Any) -> str:
         if obj is None:
@@ -70,8 +1086,62 @@ class CryptoComponent:
         except Exception as e:
             raise ValueError(f"Failed to deserialize CP-ABE object: {e}")
 
+    # ---------- User Secret Key Cache ----------
+    def _get_user_sk(self, user_sk_b64: str, cache_key: tuple | None = None):
+        """Deserialize a user SK, going through the LRU when the caller supplies a cache key."""
+        if cache_key is None:
+            return self._obj_from_b64(user_sk_b64)
+        # Master key version is part of the key so a reload never serves stale objects
+        full_key = (*cache_key, self.master_key_version)
+        sk = self._sk_cache.get(full_key)
+        if sk is None:
+            sk = self._obj_from_b64(user_sk_b64)
+            self._sk_cache.put(full_key, sk, size=len(user_sk_b64))
+        return sk
+
+    def invalidate_user_sk(self, username: str) -> int:
+        """Forget every cached SK for a user (called when their key changes)."""
+        return self._sk_cache.invalidate(lambda k: k[0] == username)
+
+    def sk_cache_stats(self) -> Dict[str, Any]:
+        return self._sk_cache.stats()
+
+    def policy_cache_stats(self) -> Dict[str, Any]:
+        return self._policy_cache.stats()
+
+    def satisfy_cache_stats(self) -> Dict[str, Any]:
+        return self._satisfy_cache.stats()
+
+    # ---------- Offline/Online ABE ----------
+    def _make_capsule(self, normalized_policy: str):
+        pool = self._get_worker_pool()
+        if pool is not None:
+            # The pairings run in a worker; unpacking the returned capsule is cheap
+            blob = pool.submit(_worker_make_capsule, self._worker_keys_name, normalized_policy).result()
+            ct, random_msg, _, _ = self._unpack_abe_envelope(blob)
+            return random_msg, ct
+        random_msg = self.group.random(GT)
+        ct = self.abe.encrypt(self._get_pk(), random_msg, normalized_policy)
+        if ct is None:
+            raise ValueError(f"{self.scheme} encryption returned None")
+        return random_msg, ct
+
+    def enable_capsule_pool(self, high_watermark: int = 8, low_watermark: int = 2,
+                            hot_threshold: int = 3, max_policies: int = 16) -> "_CapsulePool":
+        """Pre-encrypt GT capsules for frequently used policies in a background thread."""
+        if self.capsule_pool is None:
+            self.capsule_pool = _CapsulePool(
+                self._make_capsule, lambda: self.master_key_version,
+                high_watermark=high_watermark, low_watermark=low_watermark,
+                hot_threshold=hot_threshold, max_policies=max_policies,
+            )
+        return self.capsule_pool
+
+    def capsule_stats(self) -> Dict[str, Any] | None:
+        return self.capsule_pool.stats() if self.capsule_pool else None
+
     # ---------- WATERS11-COMPATIBLE NORMALIZATION ----------
-    def _normalize_attributes(self, attributes: list[str]) -> list[str]:
+    def _normalize_attributes(self, attributes: list[str], verbose: bool = True) -> list[str]:
         """Normalize attributes to numeric format for Waters11."""
         attr_map = {
             'role:prof': '1', 'role:student': '2', 'role:admin': '3',
@@ -86,83 +1156,275 @@ class CryptoComponent:
                 # Hash unknown attributes to numbers
                 normalized.append(str(abs(hash(attr)) % 50 + 1))
         
-        print(f"Normalized attributes: {normalized}")
+        if verbose:
+            print(f"Normalized attributes: {normalized}")
         return normalized
 
     def _normalize_policy(self, policy: str) -> str:
         """Convert policy to Waters11-compatible format."""
         if not policy or not policy.strip():
             raise ValueError("Policy cannot be empty")
-        
-        # Map policy terms to numeric format
-        attr_map = {
-            'role:prof': '1', 'ROLE_PROF': '1', 'prof': '1',
-            'role:student': '2', 'ROLE_STUDENT': '2', 'student': '2', 
-            'role:admin': '3', 'ROLE_ADMIN': '3', 'admin': '3',
-            'dept:cs': '10', 'DEPT_CS': '10', 'cs': '10',
-            'dept:math': '11', 'DEPT_MATH': '11', 'math': '11',
-            'dept:eng': '12', 'DEPT_ENG': '12', 'eng': '12'
-        }
-        
-        normalized = policy.strip()
-        for key, value in attr_map.items():
-            normalized = normalized.replace(key, value)
-        
+
+        # Operators (and/or) are not in the map, so they pass through untouched
+        normalized = _POLICY_TOKEN_RE.sub(
+            lambda m: _POLICY_ATTR_MAP.get(m.group(0), m.group(0)), policy.strip()
+        )
+
         print(f"Normalized policy: {normalized}")
         return normalized
 
+    def _get_policy_tree(self, normalized_policy: str):
+        """Parsed policy tree for a normalized policy string, from the LRU when possible."""
+        tree = self._policy_cache.get(normalized_policy)
+        if tree is None:
+            tree = self.abe.util.createPolicy(normalized_policy)
+            self._policy_cache.put(normalized_policy, tree)
+        return tree
+
+    def _minimal_satisfying_set(self, attr_list: list[str], policy_str: str) -> tuple[str, ...]:
+        """Smallest attribute subset of attr_list satisfying the policy; () if it can't be satisfied."""
+        key = (tuple(sorted(attr_list)), policy_str)
+        subset = self._satisfy_cache.get(key)
+        if subset is None:
+            leaves = _min_satisfying_leaves(self._get_policy_tree(policy_str), set(attr_list))
+            subset = tuple(dict.fromkeys(leaves)) if leaves else ()
+            self._satisfy_cache.put(key, subset)
+        return subset
+
+    def _peek_abe_policy(self, abe_ct: str) -> str:
+        """Read only the policy string from an abe_ct, without touching group elements."""
+        if abe_ct.lstrip().startswith("{"):
+            return json.loads(abe_ct)['policy_str']
+        data = base64.b64decode(abe_ct.encode("ascii"))
+        if data[:3] != ABE_ENVELOPE_MAGIC or len(data) < 5:
+            raise ValueError("abe_ct is not a binary envelope")
+        reader = _FieldReader(data, 5)
+        if data[3] >= 2:
+            reader.read()  # scheme name
+        return reader.read().decode("utf-8")
+
     # ---------------- Setup / Keys ----------------
+    def _warm_precomputation(self, pk) -> int:
+        """Build fixed-base tables (initPP) for the PK elements the scheme exponentiates.
+
+        For Waters11, keygen raises g1_a, g2 and h[attr] to t; encrypt raises
+        g1_a, g2, h[attr] and e_gg_alpha to fresh exponents. Charm uses the table
+        automatically once an element has one.
+        """
+        bases = self.abe.fixed_bases(pk)
+        for elem in bases:
+            elem.initPP()
+        return len(bases)
+
+    def _set_master_keys(self, pk, msk, pk_b64: str, msk_b64: str, stamp: tuple | None):
+        if self.precompute:
+            start = time.time()
+            self.precomputed_bases = self._warm_precomputation(pk)
+            print(f"Precomputed {self.precomputed_bases} fixed bases in {(time.time() - start) * 1000:.1f} ms")
+        self._pk, self._msk = pk, msk
+        self._pk_b64, self._msk_b64 = pk_b64, msk_b64
+        self._keys_stamp = stamp
+        self.master_key_version += 1
+        if self.capsule_pool:
+            self.capsule_pool.clear()
+
+    def _key_paths(self, name: str) -> tuple[str, str]:
+        return (os.path.join(self.keys_folder, f"{name}_pk.b64"),
+                os.path.join(self.keys_folder, f"{name}_msk.b64"))
+
+    def _key_files_stamp(self, name: str) -> tuple:
+        pk_path, msk_path = self._key_paths(name)
+        pk_st, msk_st = os.stat(pk_path), os.stat(msk_path)
+        return (name, pk_st.st_mtime_ns, pk_st.st_size, msk_st.st_mtime_ns, msk_st.st_size)
+
     def setup(self, force: bool = False):
         if self._pk_b64 and self._msk_b64 and not force:
             return
-        print("Setting up Waters11 CP-ABE master keys...")
+        print(f"Setting up {self.scheme} CP-ABE master keys on {self.curve}...")
         try:
-            pk, msk = self.cpabe.setup()
+            pk, msk = self.abe.setup()
             print(f"Generated PK type: {type(pk)}, MSK type: {type(msk)}")
-            self._pk_b64 = self._b64_obj(pk)
-            self._msk_b64 = self._b64_obj(msk)
-            print("Waters11 master keys setup complete")
+            with self._keys_lock:
+                self._set_master_keys(pk, msk, self._b64_obj(pk), self._b64_obj(msk), None)
+            print(f"{self.scheme} master keys setup complete")
         except Exception as e:
-            print(f"Waters11 setup failed: {e}")
+            print(f"{self.scheme} setup failed: {e}")
             raise
 
-    def save_master_keys(self, name: str = "master"):
+    def save_master_keys(self, name: str | None = None):
         if not self._pk_b64 or not self._msk_b64:
             raise RuntimeError("Keys not initialized. Call setup() first.")
-        with open(os.path.join(self.keys_folder, f"{name}_pk.b64"), "w") as f:
+        name = name or self._epoch_keys_name(self.key_epoch)
+        pk_path, msk_path = self._key_paths(name)
+        with open(pk_path, "w") as f:
             f.write(self._pk_b64)
-        with open(os.path.join(self.keys_folder, f"{name}_msk.b64"), "w") as f:
+        with open(msk_path, "w") as f:
             f.write(self._msk_b64)
+        # The in-memory objects already match what was just written
+        self._keys_stamp = self._key_files_stamp(name)
 
-    def load_master_keys(self, name: str = "master"):
-        pk_path = os.path.join(self.keys_folder, f"{name}_pk.b64")
-        msk_path = os.path.join(self.keys_folder, f"{name}_msk.b64")
+    def load_master_keys(self, name: str | None = None):
+        """Load master keys from disk, skipping the read if the files are unchanged."""
+        name = name or self._epoch_keys_name(self.key_epoch)
+        pk_path, msk_path = self._key_paths(name)
         if not os.path.exists(pk_path) or not os.path.exists(msk_path):
             raise FileNotFoundError("Master keys not found. Run setup() first.")
-        with open(pk_path, "r") as f:
-            self._pk_b64 = f.read().strip()
-        with open(msk_path, "r") as f:
-            self._msk_b64 = f.read().strip()
+        stamp = self._key_files_stamp(name)
+        if stamp == self._keys_stamp and self._pk is not None:
+            return
+        with self._keys_lock:
+            if stamp == self._keys_stamp and self._pk is not None:
+                return
+            with open(pk_path, "r") as f:
+                pk_b64 = f.read().strip()
+            with open(msk_path, "r") as f:
+                msk_b64 = f.read().strip()
+            self._set_master_keys(self._obj_from_b64(pk_b64), self._obj_from_b64(msk_b64),
+                                  pk_b64, msk_b64, stamp)
+            print(f"Loaded master keys '{name}' (version {self.master_key_version})")
+
+    # ---------------- Key Epochs ----------------
+    # Epoch 1 is the original, unversioned key files (keys_name); epoch N > 1
+    # lives in keys_name_eN. The registry in keys_name_epochs.json names the
+    # current epoch. Old epochs stay on disk until every abe_ct and user SK
+    # has moved on, since re-wrapping needs the old MSK.
+    def _epoch_keys_name(self, epoch: int) -> str:
+        return self.keys_name if epoch == 1 else f"{self.keys_name}_e{epoch}"
+
+    def _epochs_path(self) -> str:
+        return os.path.join(self.keys_folder, f"{self.keys_name}_epochs.json")
+
+    def _read_key_epochs(self) -> Dict[str, Any]:
+        path = self._epochs_path()
+        if not os.path.exists(path):
+            return {"current": 1, "epochs": {"1": {"created": None}}}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _write_key_epochs(self, registry: Dict[str, Any]):
+        # Write-then-rename so a crash never leaves a half-written registry
+        path = self._epochs_path()
+        with open(path + ".tmp", "w") as f:
+            json.dump(registry, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def rotate_master_keys(self) -> int:
+        """Generate and activate a new master key epoch; returns the new epoch.
+
+        File bodies are untouched. New uploads and keygens use the new epoch at
+        once; existing abe_cts and user SKs are moved over by rewrap_abe_ct.
+        """
+        with self._keys_lock:
+            registry = self._read_key_epochs()
+            new_epoch = registry["current"] + 1
+            pk, msk = self.abe.setup()
+            self._set_master_keys(pk, msk, self._b64_obj(pk), self._b64_obj(msk), None)
+            self.key_epoch = new_epoch
+            self.save_master_keys()
+            registry["current"] = new_epoch
+            registry["epochs"][str(new_epoch)] = {"created": time.strftime("%Y-%m-%dT%H:%M:%S")}
+            self._write_key_epochs(registry)
+            self._worker_keys_name = self._epoch_keys_name(new_epoch)
+        print(f"Rotated {self.scheme} master keys to epoch {new_epoch}")
+        return new_epoch
+
+    def _get_epoch_keys(self, epoch: int) -> tuple:
+        """(pk, msk) of any epoch, loaded once and kept apart from the active key set."""
+        keys = self._epoch_keys.get(epoch)
+        if keys is None:
+            pk_path, msk_path = self._key_paths(self._epoch_keys_name(epoch))
+            if not os.path.exists(pk_path) or not os.path.exists(msk_path):
+                raise FileNotFoundError(f"Master keys for epoch {epoch} not found")
+            with open(pk_path, "r") as f:
+                pk = self._obj_from_b64(f.read().strip())
+            with open(msk_path, "r") as f:
+                msk = self._obj_from_b64(f.read().strip())
+            keys = self._epoch_keys[epoch] = (pk, msk)
+        return keys
+
+    def rewrap_abe_ct(self, abe_ct: str, from_epoch: int, to_epoch: int | None = None) -> str:
+        """Move an abe_ct to another key epoch, keeping its policy and wrapped AES key.
+
+        The old header is opened with a one-off authority key (old MSK, just
+        the policy attributes it needs) and checked before the AES key is
+        wrapped again under the target epoch's PK. Only the header changes.
+        """
+        to_epoch = to_epoch or self.key_epoch
+        old_pk, old_msk = self._get_epoch_keys(from_epoch)
+        new_pk, _ = self._get_epoch_keys(to_epoch)
+        try:
+            policy_str = self._peek_abe_policy(abe_ct)
+            tree = self._get_policy_tree(policy_str)
+            needed = self._minimal_satisfying_set(_policy_leaves(tree), policy_str)
+            authority_sk = self.abe.keygen(old_pk, old_msk, list(needed))
+
+            ct, random_msg, plaintext, _ = self._read_abe_ct(abe_ct)
+            self.abe.attach_policy(ct, tree, policy_str)
+            if self.abe.decrypt(old_pk, ct, authority_sk) != random_msg:
+                raise ValueError(f"abe_ct does not open under epoch {from_epoch}")
+
+            new_msg = self.group.random(GT)
+            new_ct = self.abe.encrypt(new_pk, new_msg, policy_str)
+            return self._pack_abe_envelope(new_ct, new_msg, plaintext, policy_str)
+        except Exception as e:
+            raise ValueError(f"{self.scheme} re-wrap from epoch {from_epoch} to {to_epoch} failed: {e}")
+
+    def submit_rewrap(self, abe_ct: str, from_epoch: int, to_epoch: int | None = None) -> Future:
+        to_epoch = to_epoch or self.key_epoch
+        pool = self._get_worker_pool()
+        if pool is None:
+            return _run_inline(self.rewrap_abe_ct, abe_ct, from_epoch, to_epoch)
+        return pool.submit(_worker_rewrap, abe_ct, from_epoch, to_epoch)
+
+    def _get_pk(self):
+        if self._pk is None:
+            raise RuntimeError("Keys not loaded.")
+        return self._pk
 
     def _get_pk_msk(self):
-        if not self._pk_b64 or not self._msk_b64:
+        if self._pk is None or self._msk is None:
             raise RuntimeError("Keys not loaded.")
-        return self._obj_from_b64(self._pk_b64), self._obj_from_b64(self._msk_b64)
+        return self._pk, self._msk
 
     def generate_user_secret(self, attributes: list[str]) -> str:
         pk, msk = self._get_pk_msk()
         norm_attrs = self._normalize_attributes(attributes)
-        print(f"Generating Waters11 user secret for attributes: {norm_attrs}")
+        print(f"Generating {self.scheme} user secret for attributes: {norm_attrs}")
         try:
-            sk = self.cpabe.keygen(pk, msk, norm_attrs)
+            sk = self.abe.keygen(pk, msk, norm_attrs)
             if sk is None:
                 raise ValueError("Failed to generate user secret key")
-            print(f"Generated Waters11 SK type: {type(sk)}")
+            print(f"Generated {self.scheme} SK type: {type(sk)}")
             return self._b64_obj(sk)
         except Exception as e:
-            print(f"Waters11 key generation failed: {e}")
+            print(f"{self.scheme} key generation failed: {e}")
             raise
 
+    def generate_user_secrets_batch(self, attribute_sets: list[list[str]]) -> list[str]:
+        """Generate one SK per attribute set, in order, reusing the loaded PK/MSK.
+
+        With a worker pool the sets are split into one slice per worker so each
+        process pays a single IPC round-trip; otherwise keys are made inline.
+        """
+        pool = self._get_worker_pool()
+        if pool is not None and len(attribute_sets) > 1:
+            step = -(-len(attribute_sets) // self._worker_processes)
+            futures = [
+                pool.submit(_worker_keygen_batch, self._worker_keys_name, attribute_sets[i:i + step])
+                for i in range(0, len(attribute_sets), step)
+            ]
+            return [sk for fut in futures for sk in fut.result()]
+
+        pk, msk = self._get_pk_msk()
+        secrets = []
+        for attributes in attribute_sets:
+            sk = self.abe.keygen(pk, msk, self._normalize_attributes(attributes, verbose=False))
+            if sk is None:
+                raise ValueError(f"Failed to generate user secret key for {attributes}")
+            secrets.append(self._b64_obj(sk))
+        print(f"Generated {len(secrets)} {self.scheme} user secrets")
+        return secrets
+
     # Serialize only group elements, handle policy separately
     def _serialize_ciphertext(self, ct: dict) -> dict:
         """Serialize each GROUP ELEMENT in the ciphertext dict to base64 string."""
@@ -201,97 +1463,436 @@ class CryptoComponent:
         
         return ct
 
+    # ---------- Binary abe_ct envelope ----------
+    def _elem_to_bytes(self, elem, compress: bool) -> bytes:
+        # group.serialize yields b"<type>:<base64>"; keep the type as one raw byte
+        type_id, b64 = self.group.serialize(elem, compression=compress).split(b":", 1)
+        return bytes([int(type_id)]) + base64.b64decode(b64)
+
+    def _elem_from_bytes(self, data: bytes, compress: bool):
+        if not data:
+            raise ValueError("empty group element in abe_ct envelope")
+        return self.group.deserialize(b"%d:" % data[0] + base64.b64encode(data[1:]), compression=compress)
+
+    def _pack_abe_envelope(self, ct: dict, random_msg, plaintext: str, policy_str: str) -> str:
+        compress = self.compress_points
+        buf = bytearray(ABE_ENVELOPE_MAGIC)
+        buf.append(ABE_ENVELOPE_VERSION)
+        buf.append(ABE_FLAG_COMPRESSED if compress else 0)
+        _put_field(buf, self.scheme.encode("utf-8"))
+        _put_field(buf, policy_str.encode("utf-8"))
+        _put_field(buf, plaintext.encode("utf-8"))
+        _put_field(buf, self._elem_to_bytes(random_msg, compress))
+        for field in self.abe.element_fields:
+            _put_field(buf, self._elem_to_bytes(ct[field], compress))
+        first_map = ct[self.abe.attr_fields[0]]
+        buf += _U16.pack(len(first_map))
+        for attr in first_map:
+            _put_field(buf, attr.encode("utf-8"))
+            for field in self.abe.attr_fields:
+                _put_field(buf, self._elem_to_bytes(ct[field][attr], compress))
+        return base64.b64encode(bytes(buf)).decode("ascii")
+
+    def _unpack_abe_envelope(self, blob: str) -> tuple[dict, Any, str, str]:
+        data = base64.b64decode(blob.encode("ascii"))
+        if data[:3] != ABE_ENVELOPE_MAGIC or len(data) < 5:
+            raise ValueError("abe_ct is not a binary envelope")
+        version = data[3]
+        if version not in (1, ABE_ENVELOPE_VERSION):
+            raise ValueError(f"Unsupported abe_ct envelope version {version}")
+        compress = bool(data[4] & ABE_FLAG_COMPRESSED)
+        reader = _FieldReader(data, 5)
+        scheme = reader.read().decode("utf-8") if version >= 2 else "waters11"
+        if scheme != self.scheme:
+            raise ValueError(f"abe_ct was made with {scheme}, this component runs {self.scheme}")
+        policy_str = reader.read().decode("utf-8")
+        plaintext = reader.read().decode("utf-8")
+        random_msg = self._elem_from_bytes(reader.read(), compress)
+        ct = {field: self._elem_from_bytes(reader.read(), compress) for field in self.abe.element_fields}
+        for field in self.abe.attr_fields:
+            ct[field] = {}
+        for _ in range(reader.read_u16()):
+            attr = reader.read().decode("utf-8")
+            for field in self.abe.attr_fields:
+                ct[field][attr] = self._elem_from_bytes(reader.read(), compress)
+        return ct, random_msg, plaintext, policy_str
+
+    def _read_abe_ct(self, abe_ct: str) -> tuple[dict, Any, str, str]:
+        """Parse an abe_ct in either the binary envelope or the legacy nested-JSON form."""
+        if abe_ct.lstrip().startswith("{"):
+            result = json.loads(abe_ct)
+            return (self._deserialize_ciphertext(result['ct']),
+                    self._obj_from_b64(result['random_msg_b64']),
+                    result['plaintext'],
+                    result['policy_str'])
+        return self._unpack_abe_envelope(abe_ct)
+
     # ---------------- String Encryption ----------------
     def abe_encrypt_str(self, policy: str, plaintext: str) -> str:
-        pk, _ = self._get_pk_msk()
+        pk = self._get_pk()
         
         normalized_policy = self._normalize_policy(policy)
         
-        print(f"Encrypting with Waters11 policy: '{normalized_policy}', plaintext length: {len(plaintext)}")
+        print(f"Encrypting with {self.scheme} policy: '{normalized_policy}', plaintext length: {len(plaintext)}")
         
         try:
-            # Generate random GT element and encrypt that
-            random_msg = self.group.random(GT)
-            ct = self.cpabe.encrypt(pk, random_msg, normalized_policy)
-            if ct is None:
-                raise ValueError("Waters11 encryption returned None")
-            print(f"Waters11 encryption successful, ciphertext type: {type(ct)}")
-            
-            # Serialize only group elements, store policy separately
-            ser_ct = self._serialize_ciphertext(ct)
-            
-            result = {
-                'ct': ser_ct,
-                'random_msg_b64': self._b64_obj(random_msg),
-                'plaintext': plaintext,
-                'policy_str': normalized_policy  # Store policy string separately
-            }
+            # Take a pre-encrypted capsule if the pool has one for this policy
+            capsule = self.capsule_pool.take(normalized_policy) if self.capsule_pool else None
+            if capsule:
+                random_msg, ct = capsule
+            else:
+                # Generate random GT element and encrypt that
+                random_msg = self.group.random(GT)
+                ct = self.abe.encrypt(pk, random_msg, normalized_policy)
+                if ct is None:
+                    raise ValueError(f"{self.scheme} encryption returned None")
+                print(f"{self.scheme} encryption successful, ciphertext type: {type(ct)}")
             
-            return json.dumps(result)
+            # Group elements and policy string go into one compact binary envelope
+            return self._pack_abe_envelope(ct, random_msg, plaintext, normalized_policy)
             
         except Exception as e:
-            print(f"Waters11 encryption failed: {e}")
-            raise ValueError(f"Waters11 encryption failed: {e}")
+            print(f"{self.scheme} encryption failed: {e}")
+            raise ValueError(f"{self.scheme} encryption failed: {e}")
 
-    def abe_decrypt_str(self, ct_json: str, user_sk_b64: str) -> str:
-        pk, _ = self._get_pk_msk()
-        sk = self._obj_from_b64(user_sk_b64)
+    def abe_decrypt_str(self, abe_ct: str, user_sk_b64: str, sk_cache_key: tuple | None = None) -> str:
+        pk = self._get_pk()
+        sk = self._get_user_sk(user_sk_b64, sk_cache_key)
         
         try:
-            # Parse JSON and deserialize components separately
-            result = json.loads(ct_json)
-            ct_group_elements = self._deserialize_ciphertext(result['ct'])
-            random_msg = self._obj_from_b64(result['random_msg_b64'])
+            # Cheap boolean pre-check before any ciphertext parsing or pairings
+            policy_str = self._peek_abe_policy(abe_ct)
+            needed = self._minimal_satisfying_set(self.abe.sk_attributes(sk), policy_str)
+            if not needed:
+                raise ValueError("policy not satisfied by user attributes")
+
+            ct_group_elements, random_msg, plaintext, _ = self._read_abe_ct(abe_ct)
             
             # Reconstruct the policy object for decryption
-            policy_str = result['policy_str']
-            policy_obj = self.cpabe.util.createPolicy(policy_str)
-            ct_group_elements['policy'] = policy_obj
+            policy_obj = self._get_policy_tree(policy_str)
+            self.abe.attach_policy(ct_group_elements, policy_obj, policy_str)
             
-            # Decrypt the random message
-            decrypted_msg = self.cpabe.decrypt(pk, ct_group_elements, sk)
+            # Decrypt with only the minimal attribute subset so fewer pairings run
+            reduced_sk = self.abe.restrict_sk(sk, needed)
+            decrypted_msg = self.abe.decrypt(pk, ct_group_elements, reduced_sk)
             if decrypted_msg is None:
-                raise ValueError("Waters11 decryption failed - policy not satisfied")
+                raise ValueError(f"{self.scheme} decryption failed - policy not satisfied")
             
             # Verify the decrypted message matches what we encrypted
             if decrypted_msg == random_msg:
-                return result['plaintext']
+                return plaintext
             else:
-                raise ValueError("Waters11 decryption verification failed")
+                raise ValueError(f"{self.scheme} decryption verification failed")
         except Exception as e:
-            raise ValueError(f"Waters11 decryption failed: {e}")
+            raise ValueError(f"{self.scheme} decryption failed: {e}")
+
+    # ---------------- Worker Pool ----------------
+    def configure_worker_pool(self, processes: int, keys_name: str | None = None, precompute: bool = False):
+        """Run keygen/encrypt/decrypt in `processes` worker processes (0 = inline).
+
+        Workers read the master keys from disk (keys_name), so they must have been
+        saved. The pool is spawned on first use rather than here, which keeps
+        module import side-effect free for spawned children. precompute builds
+        fixed-base tables in each worker.
+        """
+        self._worker_processes = max(0, processes)
+        self._worker_precompute = precompute
+        self._worker_keys_name = keys_name or self._epoch_keys_name(self.key_epoch)
+
+    def _get_worker_pool(self) -> ProcessPoolExecutor | None:
+        if self._worker_processes <= 0:
+            return None
+        if self._worker_pool is None:
+            with self._worker_pool_lock:
+                if self._worker_pool is None:
+                    self._worker_pool = ProcessPoolExecutor(
+                        max_workers=self._worker_processes,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_crypto_worker,
+                        initargs=(self.curve, self.uni_size, self.scheme, self._worker_precompute),
+                    )
+                    print(f"Started {self._worker_processes} CP-ABE worker processes")
+        return self._worker_pool
+
+    def shutdown_worker_pool(self):
+        with self._worker_pool_lock:
+            if self._worker_pool is not None:
+                self._worker_pool.shutdown(wait=True)
+                self._worker_pool = None
+
+    def submit_keygen(self, attributes: list[str]) -> Future:
+        pool = self._get_worker_pool()
+        if pool is None:
+            return _run_inline(self.generate_user_secret, attributes)
+        return pool.submit(_worker_keygen, self._worker_keys_name, attributes)
+
+    def submit_abe_encrypt(self, policy: str, plaintext: str) -> Future:
+        pool = self._get_worker_pool()
+        if pool is None:
+            return _run_inline(self.abe_encrypt_str, policy, plaintext)
+        # A ready capsule only needs packing, which is cheaper than a round-trip
+        if self.capsule_pool:
+            normalized_policy = self._normalize_policy(policy)
+            capsule = self.capsule_pool.take(normalized_policy)
+            if capsule:
+                random_msg, ct = capsule
+                return _run_inline(self._pack_abe_envelope, ct, random_msg, plaintext, normalized_policy)
+        return pool.submit(_worker_abe_encrypt, self._worker_keys_name, policy, plaintext)
+
+    def submit_abe_decrypt(self, abe_ct: str, user_sk_b64: str, sk_cache_key: tuple | None = None) -> Future:
+        pool = self._get_worker_pool()
+        if pool is None:
+            return _run_inline(self.abe_decrypt_str, abe_ct, user_sk_b64, sk_cache_key)
+        return pool.submit(_worker_abe_decrypt, self._worker_keys_name, abe_ct, user_sk_b64, sk_cache_key)
+
+    # ---------------- Outsourced Decryption (GHW11) ----------------
+    # A transformation key is the SK raised to 1/z; z is the retrieval key that
+    # never leaves the API node. Whoever holds the TK can do all the pairings
+    # and gets e(g,g)^(alpha*s/z), which reveals nothing without z. The API
+    # node then finishes with a single GT exponentiation.
+    def _require_transform(self):
+        if not self.abe.supports_transform:
+            raise ValueError(f"Outsourced decryption is not implemented for {self.scheme}")
+
+    def generate_transform_key(self, user_sk_b64: str) -> tuple[str, str]:
+        """Return (tk_b64, rk_b64) for a Waters11 user SK."""
+        self._require_transform()
+        sk = self._obj_from_b64(user_sk_b64)
+        z = self.group.random(ZR)
+        inv_z = 1 / z
+        tk = {
+            'attr_list': sk['attr_list'],
+            'k0': sk['k0'] ** inv_z,
+            'L': sk['L'] ** inv_z,
+            'K': {attr: k ** inv_z for attr, k in sk['K'].items()},
+        }
+        return self._b64_obj(tk), self._b64_obj(z)
+
+    def export_transform_ct(self, abe_ct: str) -> str:
+        """Strip an abe_ct down to the parts an outsourcing worker may see."""
+        self._require_transform()
+        ct, _, _, policy_str = self._read_abe_ct(abe_ct)
+        compress = self.compress_points
+        buf = bytearray(ABE_TRANSFORM_MAGIC)
+        buf.append(ABE_ENVELOPE_VERSION)
+        buf.append(ABE_FLAG_COMPRESSED if compress else 0)
+        _put_field(buf, policy_str.encode("utf-8"))
+        _put_field(buf, self._elem_to_bytes(ct['c0'], compress))
+        buf += _U16.pack(len(ct['C']))
+        for attr, c_elem in ct['C'].items():
+            _put_field(buf, attr.encode("utf-8"))
+            _put_field(buf, self._elem_to_bytes(c_elem, compress))
+            _put_field(buf, self._elem_to_bytes(ct['D'][attr], compress))
+        return base64.b64encode(bytes(buf)).decode("ascii")
+
+    def _unpack_transform_ct(self, transform_ct: str) -> tuple[dict, str]:
+        data = base64.b64decode(transform_ct.encode("ascii"))
+        if data[:3] != ABE_TRANSFORM_MAGIC or len(data) < 5 or data[3] != ABE_ENVELOPE_VERSION:
+            raise ValueError("Not a supported transform ciphertext")
+        compress = bool(data[4] & ABE_FLAG_COMPRESSED)
+        reader = _FieldReader(data, 5)
+        policy_str = reader.read().decode("utf-8")
+        ct = {'c0': self._elem_from_bytes(reader.read(), compress), 'C': {}, 'D': {}}
+        for _ in range(reader.read_u16()):
+            attr = reader.read().decode("utf-8")
+            ct['C'][attr] = self._elem_from_bytes(reader.read(), compress)
+            ct['D'][attr] = self._elem_from_bytes(reader.read(), compress)
+        return ct, policy_str
+
+    def transform_decrypt(self, transform_ct: str, tk_b64: str) -> str:
+        """Pairing-heavy partial decryption; safe to run on an untrusted worker.
+
+        Needs neither the master keys nor the user's SK. Returns the serialized
+        partial value e(g,g)^(alpha*s/z).
+        """
+        self._require_transform()
+        ct, policy_str = self._unpack_transform_ct(transform_ct)
+        tk = self._obj_from_b64(tk_b64)
+        needed = self._minimal_satisfying_set(tk['attr_list'], policy_str)
+        if not needed:
+            raise ValueError("policy not satisfied by user attributes")
+        nodes = self.abe.util.prune(self._get_policy_tree(policy_str), list(needed))
+
+        prod_c = 1
+        prod_gt = 1
+        for node in nodes:
+            attr = node.getAttributeAndIndex()
+            attr_stripped = self.abe.util.strip_index(attr)
+            prod_c *= ct['C'][attr]
+            prod_gt *= pair(tk['K'][attr_stripped], ct['D'][attr])
+        partial = pair(tk['k0'], ct['c0']) / (pair(prod_c, tk['L']) * prod_gt)
+        return self._b64_obj(partial)
+
+    def finish_decrypt(self, abe_ct: str, partial_b64: str, rk_b64: str) -> str:
+        """Recover the plaintext from a worker's partial value with one exponentiation."""
+        ct, random_msg, plaintext, _ = self._read_abe_ct(abe_ct)
+        partial = self._obj_from_b64(partial_b64)
+        z = self._obj_from_b64(rk_b64)
+        if ct['c_m'] / (partial ** z) != random_msg:
+            raise ValueError("Waters11 outsourced decryption verification failed")
+        return plaintext
+
+    def submit_transform(self, transform_ct: str, tk_b64: str) -> Future:
+        pool = self._get_worker_pool()
+        if pool is None:
+            return _run_inline(self.transform_decrypt, transform_ct, tk_b64)
+        return pool.submit(_worker_transform, transform_ct, tk_b64)
+
+    def abe_decrypt_outsourced(self, abe_ct: str, tk_b64: str, rk_b64: str) -> str:
+        """Decrypt with the pairings done by the worker pool using only the TK."""
+        try:
+            partial_b64 = self.submit_transform(self.export_transform_ct(abe_ct), tk_b64).result()
+            return self.finish_decrypt(abe_ct, partial_b64, rk_b64)
+        except Exception as e:
+            raise ValueError(f"Waters11 outsourced decryption failed: {e}")
+
+    # ---------------- Symmetric File Layer ----------------
+    def _use_parallel(self, path: str) -> bool:
+        return self.file_workers > 1 and os.path.getsize(path) >= PARALLEL_MIN_SIZE
+
+    def select_cipher_suite(self, name: str = "auto") -> str:
+        """Set the suite for new files; "auto" runs a micro-benchmark and keeps the fastest.
+
+        Existing files are unaffected: their header names the suite they were sealed with.
+        """
+        if name == "auto":
+            self.cipher_suite_benchmark = benchmark_cipher_suites()
+            name = max(self.cipher_suite_benchmark, key=self.cipher_suite_benchmark.get)
+            print(f"Cipher suite benchmark (MB/s): {self.cipher_suite_benchmark} -> {name}")
+        self.cipher_suite = get_cipher_suite(name)
+        return self.cipher_suite.name
+
+    def cipher_suite_stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.cipher_suite.name,
+            "available": [n for n, suite in CIPHER_SUITES.items() if suite.available],
+            "benchmark_mb_s": self.cipher_suite_benchmark,
+        }
+
+    def configure_compression(self, name: str):
+        """"auto" (zstd if installed, else zlib), "zstd", "zlib" or "none" for new files."""
+        self.compression = get_compression_codec(name)
+
+    def _record_compression(self, codec: int, plain_size: int, stored_size: int):
+        with self._compression_lock:
+            self._compression_counts["files_compressed" if codec != CODEC_NONE else "files_stored_raw"] += 1
+            self._compression_counts["plain_bytes"] += plain_size
+            self._compression_counts["stored_bytes"] += stored_size
+
+    def compression_stats(self) -> Dict[str, Any]:
+        with self._compression_lock:
+            counts = dict(self._compression_counts)
+        plain = counts.get("plain_bytes", 0)
+        return {
+            "codec": _CODEC_NAMES.get(self.compression, "none"),
+            "files_compressed": counts.get("files_compressed", 0),
+            "files_stored_raw": counts.get("files_stored_raw", 0),
+            "plain_bytes": plain,
+            "stored_bytes": counts.get("stored_bytes", 0),
+            "ratio": round(counts.get("stored_bytes", 0) / plain, 3) if plain else None,
+        }
+
+    def _encrypt_file_body(self, in_path: str, out_path: str, key: bytes,
+                           indexer: _StreamIndexer | None = None) -> int:
+        if self._use_parallel(in_path):
+            return _aes_encrypt_file_parallel(in_path, out_path, key, self._file_pool, self.file_workers,
+                                              suite=self.cipher_suite, codec=self.compression, indexer=indexer)
+        return _aes_encrypt_file_stream(in_path, out_path, key, suite=self.cipher_suite, codec=self.compression,
+                                        indexer=indexer)
+
+    def _decrypt_file_body(self, in_path: str, out_path: str, key: bytes):
+        if self._use_parallel(in_path):
+            _aes_decrypt_file_parallel(in_path, out_path, key, self._file_pool, self.file_workers)
+        else:
+            _aes_decrypt_file_stream(in_path, out_path, key)
 
     # ---------------- Hybrid File Encryption ----------------
     def encrypt_file_hybrid(self, file_path: str, policy: str) -> Dict[str, Any]:
-        """Encrypt file using AES + encrypt AES key with Waters11 CP-ABE."""
+        """Encrypt file using AES + encrypt AES key with Waters11 CP-ABE.
+
+        Also writes the chunk index sidecar to index_file_path, to be stored
+        beside the ciphertext object.
+        """
         aes_key = get_random_bytes(32)
         enc_file_path = file_path + ".enc"
-        _aes_encrypt_file(file_path, enc_file_path, aes_key)
+        index_file_path = enc_file_path + ".idx"
+        key_epoch = self.key_epoch
+        indexer = _StreamIndexer()
 
-        aes_key_hex = aes_key.hex()
+        # With a worker pool the ABE wrap runs while the body is being encrypted
         print(f"Encrypting AES key with Waters11 policy: {policy}")
-        abe_ct_json = self.abe_encrypt_str(policy, aes_key_hex)
+        abe_future = self.submit_abe_encrypt(policy, aes_key.hex())
+        codec = self._encrypt_file_body(file_path, enc_file_path, aes_key, indexer)
+        abe_ct = abe_future.result()
+        plain_size = os.path.getsize(file_path)
+        self._record_compression(codec, plain_size, indexer.size)
+        chunk_index, merkle = indexer.metadata(plain_size)
+        indexer.write_sidecar(index_file_path)
 
         return {
             "orig_filename": os.path.basename(file_path),
             "enc_file_path": enc_file_path,
-            "abe_ct": abe_ct_json,
+            "index_file_path": index_file_path,
+            "abe_ct": abe_ct,
             "policy": policy,
+            "enc_format": ENC_FORMAT_STREAM,
+            "cipher_suite": self.cipher_suite.name,
+            "compression": _CODEC_NAMES.get(codec, "none"),
+            "chunk_index": chunk_index,
+            "merkle": merkle,
+            "key_epoch": key_epoch,
         }
 
-    def decrypt_file_hybrid(self, meta: Dict[str, Any], user_sk_b64: str, out_plain_path: str = None) -> str:
-        """Decrypt file using Waters11 ABE SK to recover AES key, then AES-decrypt file."""
-        aes_key_hex = self.abe_decrypt_str(meta["abe_ct"], user_sk_b64)
-        aes_key = bytes.fromhex(aes_key_hex)
+    def recover_file_key(self, abe_ct: str, user_sk_b64: str, sk_cache_key: tuple | None = None,
+                         transform_keys: tuple[str, str] | None = None) -> bytes:
+        """ABE-decrypt a file's AES key (outsourced when transform_keys is given)."""
+        if transform_keys:
+            aes_key_hex = self.abe_decrypt_outsourced(abe_ct, *transform_keys)
+        else:
+            aes_key_hex = self.submit_abe_decrypt(abe_ct, user_sk_b64, sk_cache_key).result()
+        return bytes.fromhex(aes_key_hex)
+
+    def decrypt_file_hybrid(self, meta: Dict[str, Any], user_sk_b64: str, out_plain_path: str = None,
+                            sk_cache_key: tuple | None = None, transform_keys: tuple[str, str] | None = None) -> str:
+        """Decrypt file using Waters11 ABE SK to recover AES key, then AES-decrypt file.
+
+        sk_cache_key, typically (username, abe_sk_version), lets the deserialized
+        SK be reused across downloads. With transform_keys (tk_b64, rk_b64) the
+        ABE step is outsourced and user_sk_b64 is not used.
+        """
+        aes_key = self.recover_file_key(meta["abe_ct"], user_sk_b64, sk_cache_key, transform_keys)
 
         if not out_plain_path:
             out_plain_path = os.path.join(
                 self.keys_folder, f"dec_{os.path.basename(meta['orig_filename'])}"
             )
 
-        _aes_decrypt_file(meta["enc_file_path"], out_plain_path, aes_key)
+        # Files uploaded before streaming encryption have no enc_format
+        if meta.get("enc_format", ENC_FORMAT_LEGACY) == ENC_FORMAT_STREAM:
+            self._decrypt_file_body(meta["enc_file_path"], out_plain_path, aes_key)
+        else:
+            _aes_decrypt_file(meta["enc_file_path"], out_plain_path, aes_key)
         return out_plain_path
     
+    # ---------------- Ranged Decryption ----------------
+    def expand_stream_index(self, chunk_index: Dict[str, Any], merkle: Dict[str, Any],
+                            sidecar: bytes | None) -> tuple[Dict[str, Any], Dict[str, Any]]:
+        """Full chunk index and Merkle tree from file metadata plus its sidecar object."""
+        return _expand_stream_index(chunk_index, merkle, sidecar)
+
+    def plan_range(self, chunk_index: Dict[str, Any], start: int, stop: int) -> Dict[str, int]:
+        """Which frames, and which ciphertext bytes (inclusive), cover plaintext [start, stop)."""
+        return _plan_stream_range(chunk_index, start, stop)
+
+    def decrypt_range(self, chunk_index: Dict[str, Any], aes_key: bytes, src, plan: Dict[str, int],
+                      merkle: Dict[str, Any] | None = None):
+        """Yield plaintext for plan, reading its ciphertext range from the file-like src."""
+        return _decrypt_stream_range(chunk_index, aes_key, src, plan, merkle)
+
+    def verify_stored_object(self, chunk_index: Dict[str, Any], merkle: Dict[str, Any], src) -> Dict[str, Any]:
+        """Check a stored ciphertext object (file-like src) against its chunk Merkle tree."""
+        return _verify_stream_object(chunk_index, merkle, src)
+
     def pqc_encrypt_wrap(self, data_bytes, public_key_hex):
         """
         Wraps the decrypted file data in a Kyber-768 Quantum-Safe envelope
@@ -299,20 +1900,83 @@ class CryptoComponent:
         """
         public_key = bytes.fromhex(public_key_hex)
         
-        with oqs.KeyEncapsulation("Kyber768") as kem:
-            # 1. Encapsulate a shared secret using the user's PQC public key
-            ciphertext, shared_secret = kem.encapsulate(public_key)
-            
-            # 2. Use the shared secret for symmetric encryption (AES-GCM)
-            
-            cipher = AES.new(shared_secret, AES.MODE_GCM)
-            ciphertext_body, tag = cipher.encrypt_and_digest(data_bytes)
-            
-            # Return the KEM ciphertext and the wrapped data
-            return {
-                "kem_ct": ciphertext.hex(),
-                "wrapped_payload": (cipher.nonce + tag + ciphertext_body).hex()
-            }
+        # 1. Encapsulate a shared secret using the user's PQC public key
+        ciphertext, shared_secret = _kyber_encapsulate(public_key)
+        
+        # 2. Use the shared secret for symmetric encryption (AES-GCM)
+        
+        cipher = AES.new(shared_secret, AES.MODE_GCM)
+        ciphertext_body, tag = cipher.encrypt_and_digest(data_bytes)
+        
+        # Return the KEM ciphertext and the wrapped data
+        return {
+            "kem_ct": ciphertext.hex(),
+            "wrapped_payload": (cipher.nonce + tag + ciphertext_body).hex()
+        }
+
+    def pqc_stream_header(self, public_key_hex: str) -> tuple[bytes, bytes]:
+        """Encapsulate to the client's Kyber key; returns (PQS1 header, frame key)."""
+        kem_ct, shared_secret = _kyber_encapsulate(bytes.fromhex(public_key_hex))
+        return PQC_STREAM_MAGIC + _U16.pack(len(kem_ct)) + kem_ct, shared_secret
+
+    def pqc_seal_file(self, plain_path: str, key: bytes, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Yield authenticated AES-GCM frames of plain_path, one chunk in memory at a time."""
+        with open(plain_path, "rb") as f:
+            yield from _seal_stream(f, key, chunk_size)
+
+    def pqc_wrap_stream(self, plain_path: str, public_key_hex: str, chunk_size: int = STREAM_CHUNK_SIZE):
+        """
+        Binary streaming variant of pqc_encrypt_wrap: yields the KEM ciphertext
+        header and then authenticated AES-GCM frames read straight from disk,
+        so only one chunk is in memory at a time.
+        """
+        header, key = self.pqc_stream_header(public_key_hex)
+        yield header
+        yield from self.pqc_seal_file(plain_path, key, chunk_size)
+
+    # ---------------- PQC Sessions ----------------
+    def configure_pqc_sessions(self, ttl_seconds: int, max_transfers: int):
+        self.pqc_sessions.ttl_seconds = ttl_seconds
+        self.pqc_sessions.max_transfers = max_transfers
+
+    def pqc_open_session(self, public_key_hex: str, owner: str | None = None) -> Dict[str, Any]:
+        """
+        One Kyber768 encapsulation for a whole download session. The shared
+        secret is run through HKDF into a session key; each later transfer gets
+        its own key derived from the session key and a fresh random salt.
+        """
+        kem_ct, shared_secret = _kyber_encapsulate(bytes.fromhex(public_key_hex))
+        session_id = get_random_bytes(PQC_SESSION_ID_SIZE)
+        session_key = HKDF(shared_secret, 32, session_id, SHA256, context=b"pqc-session")
+        self.pqc_sessions.open(session_key, session_id, owner)
+        return {
+            "session_id": session_id.hex(),
+            "kem_ct": kem_ct.hex(),
+            "ttl_seconds": self.pqc_sessions.ttl_seconds,
+            "max_transfers": self.pqc_sessions.max_transfers,
+        }
+
+    def pqc_check_session(self, session_id_hex: str, owner: str | None = None):
+        """Raise ValueError if the session could not serve a transfer; doesn't use one up."""
+        self.pqc_sessions.check(bytes.fromhex(session_id_hex), owner)
+
+    def pqc_session_header(self, session_id_hex: str, owner: str | None = None) -> tuple[bytes, bytes]:
+        """Consume one session transfer; returns (PQSS header, frame key)."""
+        session_id = bytes.fromhex(session_id_hex)
+        session_key = self.pqc_sessions.take_transfer(session_id, owner)
+        salt = get_random_bytes(PQC_TRANSFER_SALT_SIZE)
+        transfer_key = HKDF(session_key, 32, salt, SHA256, context=b"pqc-transfer")
+        return PQC_SESSION_MAGIC + session_id + salt, transfer_key
+
+    def pqc_wrap_stream_session(self, plain_path: str, session_id_hex: str, owner: str | None = None,
+                                chunk_size: int = STREAM_CHUNK_SIZE):
+        """Like pqc_wrap_stream, but keyed from an open session instead of a new encapsulation."""
+        header, key = self.pqc_session_header(session_id_hex, owner)
+        yield header
+        yield from self.pqc_seal_file(plain_path, key, chunk_size)
+
+    def pqc_session_stats(self) -> Dict[str, Any]:
+        return self.pqc_sessions.stats()
 
 if __name__ == "__main__":
     cc = CryptoComponent()
@@ -323,3 +1987,4 @@ if __name__ == "__main__":
     meta = cc.encrypt_file_hybrid("test.txt", "role:admin")
     dec_path = cc.decrypt_file_hybrid(meta, user_sk)
     print("Decrypted file saved to:", dec_path)
+    os.remove(meta["index_file_path"])
@@ -3,14 +3,14 @@ import uuid
 import os
 import json
 from datetime import datetime
-from .user_component import load_db, save_db
+from .user_component import DB_LOCK, load_db, save_db
 from werkzeug.utils import secure_filename
 
 class FileComponent:
     def __init__(self):
         self.db = load_db()
 
-    def register_encrypted_file(self, uploader, metadata, s3_key=None):
+    def register_encrypted_file(self, uploader, metadata, s3_key=None, index_key=None):
         # Internal UUID for security
         fid = str(uuid.uuid4())
         
@@ -19,7 +19,7 @@ class FileComponent:
         base_name = os.path.splitext(original_filename)[0]
         display_name = secure_filename(base_name)
         
-        self.db["files"][fid] = {
+        record = {
             "id": fid,
             "display_name": display_name,  # ✅ Add this for user interface
             "user_friendly_id": display_name,  # ✅ For CLI display
@@ -28,29 +28,63 @@ class FileComponent:
             "enc_file_path": metadata["enc_file_path"],
             "abe_ct": metadata["abe_ct"],
             "policy": metadata["policy"],
+            "enc_format": metadata.get("enc_format", "gcm"),
+            "cipher_suite": metadata.get("cipher_suite", "aes-gcm"),
+            "compression": metadata.get("compression", "none"),
+            # Header, sizes and frame count for ranged downloads (stream files only)
+            "chunk_index": metadata.get("chunk_index"),
+            # Root of the per-chunk SHA-256 Merkle tree over the stored ciphertext
+            "merkle": metadata.get("merkle"),
+            # S3 object holding the frame offsets and Merkle leaves
+            "index_key": index_key,
+            # Master key epoch the abe_ct is wrapped under (files before rotation: 1)
+            "key_epoch": metadata.get("key_epoch", 1),
             "s3_key": s3_key,
             "created": datetime.utcnow().isoformat(),
             "context_policy": {},
         }
-        save_db(self.db)
+        with DB_LOCK:
+            self.db["files"][fid] = record
+            save_db(self.db)
         return fid
 
     def get_file(self, fid):
         return self.db["files"].get(fid)
 
     def list_files(self):
-        return list(self.db["files"].values())
+        with DB_LOCK:
+            return list(self.db["files"].values())
 
     def set_s3_key(self, fid, s3_key):
-        if fid not in self.db["files"]:
-            return False
-        self.db["files"][fid]["s3_key"] = s3_key
-        save_db(self.db)
+        with DB_LOCK:
+            if fid not in self.db["files"]:
+                return False
+            self.db["files"][fid]["s3_key"] = s3_key
+            save_db(self.db)
         return True
 
+    def set_abe_cts(self, updates, key_epoch):
+        """Store re-wrapped headers ({fid: abe_ct}) for key_epoch, in one db write."""
+        with DB_LOCK:
+            for fid, abe_ct in updates.items():
+                if fid in self.db["files"]:
+                    self.db["files"][fid]["abe_ct"] = abe_ct
+                    self.db["files"][fid]["key_epoch"] = key_epoch
+            if updates:
+                save_db(self.db)
+
+    def set_scrub_results(self, results):
+        """Store {fid: scrub result} as each file's last_scrub, in one db write."""
+        with DB_LOCK:
+            for fid, result in results.items():
+                if fid in self.db["files"]:
+                    self.db["files"][fid]["last_scrub"] = result
+            save_db(self.db)
+
     def set_context_policy(self, fid, policy):
-        if fid not in self.db["files"]:
-            return False
-        self.db["files"][fid]["context_policy"] = policy
-        save_db(self.db)
+        with DB_LOCK:
+            if fid not in self.db["files"]:
+                return False
+            self.db["files"][fid]["context_policy"] = policy
+            save_db(self.db)
         return True
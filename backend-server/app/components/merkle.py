@@ -0,0 +1,58 @@
+# backend/components/merkle.py
+"""
+Binary SHA-256 Merkle trees with domain-separated leaf/node hashes.
+
+An odd node at the end of a level is promoted unchanged rather than paired
+with itself, so two different leaf lists can never share a root.
+"""
+import hashlib
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(data: bytes) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level: list[bytes]) -> list[bytes]:
+    parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(leaves: list[bytes]) -> bytes:
+    """Root over already-hashed leaves; an empty tree hashes to sha256(b"")."""
+    if not leaves:
+        return hashlib.sha256(b"").digest()
+    level = list(leaves)
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def merkle_proof(leaves: list[bytes], index: int) -> list[tuple[bytes, bool]]:
+    """Audit path for leaves[index] as (sibling, sibling_is_left) pairs, leaf to root."""
+    if not 0 <= index < len(leaves):
+        raise IndexError("leaf index out of range")
+    proof = []
+    level = list(leaves)
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append((level[sibling], sibling < index))
+        level = _next_level(level)
+        index //= 2
+    return proof
+
+
+def verify_proof(leaf: bytes, proof: list[tuple[bytes, bool]], root: bytes) -> bool:
+    node = leaf
+    for sibling, sibling_is_left in proof:
+        node = node_hash(sibling, node) if sibling_is_left else node_hash(node, sibling)
+    return node == root
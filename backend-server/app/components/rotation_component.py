@@ -0,0 +1,159 @@
+# backend/components/rotation_component.py
+import threading
+import time
+from datetime import datetime
+
+
+class KeyRotationComponent:
+    """
+    Moves files and users onto the current master key epoch after a rotation.
+    Only metadata changes: a file's abe_ct header is re-wrapped and a user's
+    SK is re-issued from their stored attributes. Encrypted bodies in S3 are
+    never read or rewritten.
+
+    Work happens lazily (ensure_* on the next download) and/or in a throttled
+    background pass that fans re-wraps out over the crypto worker pool.
+    """
+
+    def __init__(self, crypto, file_comp, user_comp, outsource=False):
+        self.crypto = crypto
+        self.file_comp = file_comp
+        self.user_comp = user_comp
+        self.outsource = outsource
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.lazy_files = 0
+        self.lazy_users = 0
+        self.job = None
+
+    # ---------- Lazy (on access) ----------
+    def ensure_user_current(self, username):
+        """Re-issue the user's SK if it predates the current epoch; returns the user record."""
+        user = self.user_comp.get_user(username)
+        if user is None or not user.get("abe_sk") or user.get("abe_sk_epoch", 1) >= self.crypto.key_epoch:
+            return user
+        # Inline keygen needs the current PK/MSK, which a fresh process has not loaded yet
+        self.crypto.load_master_keys()
+        epoch = self.crypto.key_epoch
+        sk_b64 = self.crypto.submit_keygen(user.get("attributes", [])).result()
+        self.user_comp.set_user_abe_sk(username, sk_b64, key_epoch=epoch)
+        if self.outsource:
+            self.user_comp.set_user_transform_keys(username, *self.crypto.generate_transform_key(sk_b64))
+        with self._lock:
+            self.lazy_users += 1
+        return self.user_comp.get_user(username)
+
+    def ensure_file_current(self, fid):
+        """Re-wrap the file's abe_ct if it predates the current epoch; returns the file record."""
+        fmeta = self.file_comp.get_file(fid)
+        if fmeta is None or fmeta.get("key_epoch", 1) >= self.crypto.key_epoch:
+            return fmeta
+        self.crypto.load_master_keys()
+        epoch = self.crypto.key_epoch
+        abe_ct = self.crypto.submit_rewrap(fmeta["abe_ct"], fmeta.get("key_epoch", 1), epoch).result()
+        self.file_comp.set_abe_cts({fid: abe_ct}, epoch)
+        with self._lock:
+            self.lazy_files += 1
+        return self.file_comp.get_file(fid)
+
+    # ---------- Background pass ----------
+    def start_background(self, rate_per_sec=200, batch_size=100):
+        """Re-wrap every stale file and re-key every stale user, at most rate_per_sec files/s."""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        epoch = self.crypto.key_epoch
+        self.job = {
+            "state": "running",
+            "target_epoch": epoch,
+            "rate_per_sec": rate_per_sec,
+            "batch_size": batch_size,
+            "files_total": 0,
+            "files_done": 0,
+            "files_failed": 0,
+            "users_rekeyed": 0,
+            "started": datetime.utcnow().isoformat(),
+            "finished": None,
+        }
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(epoch, rate_per_sec, batch_size), name="key-rotation", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop_background(self):
+        self._stop.set()
+
+    def _rekey_users(self, epoch, batch_size):
+        stale = []
+        for username in self.user_comp.list_users():
+            user = self.user_comp.get_user(username)
+            if user.get("abe_sk") and user.get("abe_sk_epoch", 1) < epoch:
+                stale.append(username)
+        for i in range(0, len(stale), batch_size):
+            if self._stop.is_set():
+                return
+            names = stale[i:i + batch_size]
+            secrets = self.crypto.generate_user_secrets_batch(
+                [self.user_comp.get_user(u).get("attributes", []) for u in names]
+            )
+            updated = self.user_comp.set_user_abe_sks(dict(zip(names, secrets)), key_epoch=epoch)
+            if self.outsource:
+                for username, sk_b64 in zip(names, secrets):
+                    self.user_comp.set_user_transform_keys(username, *self.crypto.generate_transform_key(sk_b64))
+            with self._lock:
+                self.job["users_rekeyed"] += len(updated)
+
+    def _run(self, epoch, rate_per_sec, batch_size):
+        try:
+            self._rekey_users(epoch, batch_size)
+            stale = [f["id"] for f in self.file_comp.list_files()
+                     if f.get("abe_ct") and f.get("key_epoch", 1) < epoch]
+            with self._lock:
+                self.job["files_total"] = len(stale)
+            for i in range(0, len(stale), batch_size):
+                if self._stop.is_set():
+                    break
+                t0 = time.time()
+                futures = {}
+                for fid in stale[i:i + batch_size]:
+                    fmeta = self.file_comp.get_file(fid)
+                    # A download may have re-wrapped it lazily since the scan
+                    if fmeta and fmeta.get("key_epoch", 1) < epoch:
+                        futures[fid] = self.crypto.submit_rewrap(fmeta["abe_ct"], fmeta.get("key_epoch", 1), epoch)
+                updates, failed = {}, 0
+                for fid, fut in futures.items():
+                    try:
+                        updates[fid] = fut.result()
+                    except Exception as e:
+                        failed += 1
+                        print(f"[ROTATION] Re-wrap of {fid} failed: {e}")
+                self.file_comp.set_abe_cts(updates, epoch)
+                with self._lock:
+                    self.job["files_done"] += len(stale[i:i + batch_size]) - failed
+                    self.job["files_failed"] += failed
+                # Throttle: a batch may not finish faster than rate_per_sec allows
+                if rate_per_sec:
+                    self._stop.wait(max(0.0, len(futures) / rate_per_sec - (time.time() - t0)))
+            state = "stopped" if self._stop.is_set() else "done"
+        except Exception as e:
+            print("[ROTATION] Background pass failed:", e)
+            state = "failed"
+        with self._lock:
+            self.job["state"] = state
+            self.job["finished"] = datetime.utcnow().isoformat()
+
+    def progress(self):
+        with self._lock:
+            job = dict(self.job) if self.job else None
+        if job and job["state"] == "running" and job["files_done"]:
+            elapsed = (datetime.utcnow() - datetime.fromisoformat(job["started"])).total_seconds()
+            remaining = job["files_total"] - job["files_done"] - job["files_failed"]
+            job["eta_seconds"] = round(remaining * elapsed / job["files_done"], 1)
+        return {
+            "key_epoch": self.crypto.key_epoch,
+            "lazy_files_rewrapped": self.lazy_files,
+            "lazy_users_rekeyed": self.lazy_users,
+            "background": job,
+        }
@@ -25,6 +25,23 @@ class S3Component:
             print("S3 download error:", e)
             return False
 
+    def get_range(self, s3_key, start, end):
+        """Ranged GET of bytes start..end (inclusive); returns the streaming body or None."""
+        try:
+            resp = self.s3.get_object(Bucket=self.bucket, Key=s3_key, Range=f"bytes={start}-{end}")
+            return resp["Body"]
+        except ClientError as e:
+            print("S3 ranged download error:", e)
+            return None
+
+    def get_bytes(self, s3_key):
+        """Whole (small) object as bytes, or None."""
+        try:
+            return self.s3.get_object(Bucket=self.bucket, Key=s3_key)["Body"].read()
+        except ClientError as e:
+            print("S3 download error:", e)
+            return None
+
     def delete_file(self, s3_key):
         try:
             self.s3.delete_object(Bucket=self.bucket, Key=s3_key)
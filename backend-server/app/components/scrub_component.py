@@ -0,0 +1,127 @@
+# backend/components/scrub_component.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class ScrubComponent:
+    """
+    Background integrity scrubber. Streams each stored ciphertext object from
+    S3 and checks it chunk by chunk against the file's Merkle tree, so silent
+    corruption is found without any keys and without decrypting anything.
+    Files uploaded before chunk trees existed are skipped.
+    """
+
+    def __init__(self, s3c, file_comp, crypto, interval_seconds=86400, workers=4):
+        self.s3c = s3c
+        self.file_comp = file_comp
+        self.crypto = crypto
+        self.interval_seconds = interval_seconds
+        self.workers = workers
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.passes = 0
+        self.files_checked = 0
+        self.files_corrupt = 0
+        self.files_skipped = 0
+        self.errors = 0
+        self.last_pass = None
+        self.corrupt = {}
+
+    def _check_file(self, fid):
+        """Verify one file's S3 object; returns the check result, or None if it has no tree."""
+        fmeta = self.file_comp.get_file(fid)
+        if not fmeta or not fmeta.get("merkle") or not fmeta.get("chunk_index") or not fmeta.get("s3_key"):
+            with self._lock:
+                self.files_skipped += 1
+            return None
+
+        index = fmeta["chunk_index"]
+        sidecar = self.s3c.get_bytes(fmeta["index_key"]) if fmeta.get("index_key") else None
+        body = self.s3c.get_range(fmeta["s3_key"], 0, index["enc_size"] - 1)
+        if body is None:
+            with self._lock:
+                self.errors += 1
+            return {"ok": False, "error": "s3 download failed"}
+        try:
+            index, merkle = self.crypto.expand_stream_index(index, fmeta["merkle"], sidecar)
+            result = self.crypto.verify_stored_object(index, merkle, body)
+        except Exception as e:
+            result = {"ok": False, "error": str(e)}
+        finally:
+            body.close()
+
+        with self._lock:
+            self.files_checked += 1
+            if result["ok"]:
+                self.corrupt.pop(fid, None)
+            else:
+                self.files_corrupt += 1
+                self.corrupt[fid] = result
+        if not result["ok"]:
+            print(f"[SCRUB] File {fid} failed integrity check: {result}")
+        return result
+
+    def _record(self, results):
+        # Results are persisted from one thread, in one write, after the checks
+        checked = datetime.utcnow().isoformat()
+        self.file_comp.set_scrub_results(
+            {fid: {"checked": checked, **r} for fid, r in results.items() if r is not None}
+        )
+
+    def scrub_file(self, fid):
+        result = self._check_file(fid)
+        self._record({fid: result})
+        return result
+
+    def run_once(self):
+        """One pass over every stored file, several objects at a time."""
+        fids = [f["id"] for f in self.file_comp.list_files()]
+        t0 = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scrub") as pool:
+            results = list(pool.map(self._check_file, fids))
+        self._record(dict(zip(fids, results)))
+        summary = {
+            "files": len(fids),
+            "checked": sum(1 for r in results if r is not None),
+            "corrupt": [fid for fid, r in zip(fids, results) if r is not None and not r["ok"]],
+            "seconds": round(time.time() - t0, 2),
+        }
+        with self._lock:
+            self.passes += 1
+            self.last_pass = {"finished": datetime.utcnow().isoformat(), **summary}
+        return summary
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                print("[SCRUB] Pass failed:", e)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="s3-scrubber", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "interval_seconds": self.interval_seconds,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "passes": self.passes,
+                "files_checked": self.files_checked,
+                "files_corrupt": self.files_corrupt,
+                "files_skipped": self.files_skipped,
+                "errors": self.errors,
+                "currently_corrupt": sorted(self.corrupt),
+                "last_pass": self.last_pass,
+            }
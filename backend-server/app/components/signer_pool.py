@@ -0,0 +1,135 @@
+# backend/components/signer_pool.py
+import itertools
+import threading
+
+
+class NonceManager:
+    """
+    Hands out nonces for one account from a local counter. The node is only
+    asked (get_transaction_count, "pending") on first use and after resync(),
+    which callers invoke when a transaction was rejected or dropped.
+    """
+
+    def __init__(self, w3, address):
+        self.w3 = w3
+        self.address = address
+        self._lock = threading.Lock()
+        self._next = None
+        self.fetches = 0
+        self.resyncs = 0
+
+    def allocate(self):
+        with self._lock:
+            if self._next is None:
+                self._next = self.w3.eth.get_transaction_count(self.address, "pending")
+                self.fetches += 1
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def resync(self):
+        with self._lock:
+            self._next = None
+            self.resyncs += 1
+
+    def peek(self):
+        with self._lock:
+            return self._next
+
+
+class Signer:
+    def __init__(self, w3, address, private_key):
+        self.address = address
+        self.private_key = private_key
+        self.nonces = NonceManager(w3, address)
+        # Held from nonce allocation to send, so one account's nonces reach the node in order
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+
+class SignerPool:
+    """
+    Several funded accounts that transactions are spread across. Each account
+    keeps its own nonce sequence and sends one transaction at a time, so
+    concurrent senders never race on a nonce and throughput grows with the
+    number of accounts instead of being serialised behind one.
+    """
+
+    def __init__(self, w3, accounts):
+        if not accounts:
+            raise ValueError("SignerPool needs at least one account")
+        self.w3 = w3
+        self.signers = [Signer(w3, address, key) for address, key in accounts]
+        self._order = itertools.cycle(range(len(self.signers)))
+        self._order_lock = threading.Lock()
+        self._chain_id = None
+
+    def __len__(self):
+        return len(self.signers)
+
+    def _acquire(self):
+        # Take the first idle signer in round-robin order; if all are busy, wait on the next one
+        with self._order_lock:
+            start = next(self._order)
+        for i in range(len(self.signers)):
+            signer = self.signers[(start + i) % len(self.signers)]
+            if signer.lock.acquire(blocking=False):
+                return signer
+        signer = self.signers[start]
+        signer.lock.acquire()
+        return signer
+
+    def chain_id(self):
+        # Asked once; build_transaction would otherwise fetch it for every transaction
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def _send_as(self, signer, call, gas, gas_price_gwei):
+        tx = call.build_transaction({
+            "from": signer.address,
+            "nonce": signer.nonces.allocate(),
+            "gas": gas,
+            "gasPrice": self.w3.to_wei(gas_price_gwei, "gwei"),
+            "chainId": self.chain_id(),
+        })
+        signed_tx = self.w3.eth.account.sign_transaction(tx, signer.private_key)
+        return self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+
+    def send(self, call, gas=200000, gas_price_gwei=20, signer=None):
+        """
+        Sign and send a contract call; returns (tx_hash, signer). A rejected
+        send resyncs that account's nonce and is retried once before raising.
+        """
+        if signer is None:
+            signer = self._acquire()
+        else:
+            signer.lock.acquire()
+        try:
+            try:
+                tx_hash = self._send_as(signer, call, gas, gas_price_gwei)
+            except Exception:
+                signer.nonces.resync()
+                tx_hash = self._send_as(signer, call, gas, gas_price_gwei)
+            signer.sent += 1
+            return tx_hash, signer
+        except Exception:
+            signer.nonces.resync()
+            signer.failed += 1
+            raise
+        finally:
+            signer.lock.release()
+
+    def stats(self):
+        return [
+            {
+                "address": s.address,
+                "sent": s.sent,
+                "failed": s.failed,
+                "next_nonce": s.nonces.peek(),
+                "nonce_fetches": s.nonces.fetches,
+                "nonce_resyncs": s.nonces.resyncs,
+            }
+            for s in self.signers
+        ]
@@ -1,52 +1,147 @@
 # backend/components/user_component.py
 import json
 import os
+import threading
 import uuid
 from datetime import datetime
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "db.json")
 
+# Held around every change to the db and its save. Request handlers and the
+# background rotation/scrub threads all write db.json, so each change must
+# be applied and saved before the next one starts.
+DB_LOCK = threading.RLock()
+_db = None
+
 def load_db():
-    if not os.path.exists(DB_PATH):
-        with open(DB_PATH, "w") as f:
-            json.dump({"users": {}, "files": {}}, f)
-    with open(DB_PATH, "r") as f:
-        return json.load(f)
+    """The process-wide db; all components share it, so one save never drops another's changes."""
+    global _db
+    with DB_LOCK:
+        if _db is None:
+            if not os.path.exists(DB_PATH):
+                with open(DB_PATH, "w") as f:
+                    json.dump({"users": {}, "files": {}}, f)
+            with open(DB_PATH, "r") as f:
+                _db = json.load(f)
+        return _db
 
 def save_db(db):
-    with open(DB_PATH, "w") as f:
-        json.dump(db, f, indent=2)
+    with DB_LOCK:
+        with open(DB_PATH, "w") as f:
+            json.dump(db, f, indent=2)
 
 class UserComponent:
     def __init__(self):
         self.db = load_db()
+        self._abe_sk_listeners = []
+
+    def on_abe_sk_change(self, callback):
+        """Register callback(username) to run whenever a user's ABE key is replaced."""
+        self._abe_sk_listeners.append(callback)
+
+    def register_user(self, username, attrs, location, department, keys=None): # Add department here
+        """keys: optional {abe_sk, abe_sk_epoch, abe_tk, abe_rk}, stored in the same write as the user."""
+        with DB_LOCK:
+            if username in self.db["users"]:
+                return False, "User exists"
+
+            uid = str(uuid.uuid4())
+            self.db["users"][username] = {
+                "id": uid,
+                "attributes": attrs,
+                "location": location,
+                "department": department, # Add this line to store it
+                "created": datetime.utcnow().isoformat(),
+                "abe_sk": None,
+            }
+            self._apply_keys(self.db["users"][username], keys or {})
+            save_db(self.db)
+            return True, self.db["users"][username]
+
+    @staticmethod
+    def _apply_keys(record, keys):
+        if keys.get("abe_sk"):
+            record["abe_sk"] = keys["abe_sk"]
+            record["abe_sk_version"] = 1
+            record["abe_sk_epoch"] = keys.get("abe_sk_epoch", 1)
+        if keys.get("abe_tk") and keys.get("abe_rk"):
+            record["abe_tk"] = keys["abe_tk"]
+            record["abe_rk"] = keys["abe_rk"]
+
+    def register_users_batch(self, users):
+        """Register many users (each may carry its keys) with a single db write.
+
+        users: list of dicts with username, attributes, location, department and
+        optionally abe_sk, abe_sk_epoch, abe_tk and abe_rk. Returns
+        (registered_records, errors_by_username).
+        """
+        registered, errors = [], {}
+        now = datetime.utcnow().isoformat()
+        with DB_LOCK:
+            for u in users:
+                username = u.get("username")
+                if not username:
+                    errors[str(username)] = "missing username"
+                    continue
+                if username in self.db["users"]:
+                    errors[username] = "User exists"
+                    continue
+                record = {
+                    "id": str(uuid.uuid4()),
+                    "attributes": u.get("attributes", []),
+                    "location": u.get("location", ""),
+                    "department": u.get("department", ""),
+                    "created": now,
+                    "abe_sk": None,
+                }
+                self._apply_keys(record, u)
+                self.db["users"][username] = record
+                registered.append({"username": username, **record})
+            if registered:
+                save_db(self.db)
+        return registered, errors
+
+    def set_user_abe_sk(self, username, sk_b64, key_epoch=None):
+        return bool(self.set_user_abe_sks({username: sk_b64}, key_epoch))
+
+    def set_user_abe_sks(self, sks, key_epoch=None):
+        """Replace several users' ABE keys ({username: sk_b64}) with one db write.
+
+        key_epoch records which master key epoch the new keys belong to.
+        Returns the usernames that were updated.
+        """
+        updated = []
+        with DB_LOCK:
+            for username, sk_b64 in sks.items():
+                user = self.db["users"].get(username)
+                if user is None:
+                    continue
+                user["abe_sk"] = sk_b64
+                user["abe_sk_version"] = user.get("abe_sk_version", 0) + 1
+                if key_epoch is not None:
+                    user["abe_sk_epoch"] = key_epoch
+                updated.append(username)
+            if updated:
+                save_db(self.db)
+        for username in updated:
+            for callback in self._abe_sk_listeners:
+                callback(username)
+        return updated
 
-    def register_user(self, username, attrs, location, department): # Add department here
-        if username in self.db["users"]:
-            return False, "User exists"
-        
-        uid = str(uuid.uuid4())
-        self.db["users"][username] = {
-            "id": uid,
-            "attributes": attrs,
-            "location": location,
-            "department": department, # Add this line to store it
-            "created": datetime.utcnow().isoformat(),
-            "abe_sk": None,
-        }
-        save_db(self.db)
-        return True, self.db["users"][username]
-
-    def set_user_abe_sk(self, username, sk_b64):
-        if username not in self.db["users"]:
-            return False
-        self.db["users"][username]["abe_sk"] = sk_b64
-        save_db(self.db)
+    def set_user_transform_keys(self, username, tk_b64, rk_b64):
+        """Store the outsourcing transformation key and its retrieval key."""
+        with DB_LOCK:
+            if username not in self.db["users"]:
+                return False
+            self.db["users"][username]["abe_tk"] = tk_b64
+            self.db["users"][username]["abe_rk"] = rk_b64
+            save_db(self.db)
         return True
 
     def get_user(self, username):
         return self.db["users"].get(username)
 
     def list_users(self):
-        return list(self.db["users"].keys())
+        with DB_LOCK:
+            return list(self.db["users"].keys())
@@ -1,9 +1,9 @@
 #server.py
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 import os
+import atexit
 import uuid
 import json
-from web3 import Web3
 
 from app.components.crypto_component import CryptoComponent
 from app.components.s3_component import S3Component
@@ -11,6 +11,11 @@ from app.components.context_component import ContextComponent
 from app.components.fl_component import FLComponent
 from app.components.user_component import UserComponent
 from app.components.file_component import FileComponent
+from app.components.scrub_component import ScrubComponent
+from app.components.rotation_component import KeyRotationComponent
+from app.components.audit_component import AuditComponent, AnchorStore, RecordLog
+from app.components.audit_journal import AuditJournal
+from app.blockchain import w3, contract, contract_v2, signers, log_to_blockchain
 
 app = Flask(__name__)
 
@@ -18,8 +23,16 @@ app = Flask(__name__)
 S3_BUCKET = "file-storage-00414"
 S3_REGION = "eu-central-1"
 
-# Components (now using Waters11)
-crypto = CryptoComponent()
+# Components (CP-ABE scheme and pairing curve are selectable; Waters11 on SS512 by default)
+ABE_SCHEME = os.environ.get("ABE_SCHEME", "waters11")
+ABE_CURVE = os.environ.get("ABE_CURVE", "SS512")
+# Pairing-heavy CP-ABE work can run in worker processes (opt-in; 0 = inline on the request
+# thread). Workers have their own SK/policy/satisfy caches, which /metrics does not see.
+CRYPTO_WORKERS = int(os.environ.get("CRYPTO_WORKERS", 0))
+# Fixed-base tables are built only in the processes that run keygen/encrypt:
+# the workers when there is a pool, otherwise this one
+ABE_PRECOMPUTE = os.environ.get("ABE_PRECOMPUTE", "1") == "1"
+crypto = CryptoComponent(curve=ABE_CURVE, scheme=ABE_SCHEME, precompute=ABE_PRECOMPUTE and CRYPTO_WORKERS == 0)
 s3c = S3Component(S3_BUCKET, region_name=S3_REGION)
 context_comp = ContextComponent()
 fl_comp = FLComponent()
@@ -29,59 +42,75 @@ fl_comp = FLComponent()
 # })
 user_comp = UserComponent()
 file_comp = FileComponent()
+# Drop cached deserialized SKs as soon as a user's key is replaced
+user_comp.on_abe_sk_change(crypto.invalidate_user_sk)
+# Keep pre-encrypted ABE capsules ready for frequently used upload policies
+crypto.enable_capsule_pool()
+crypto.configure_worker_pool(CRYPTO_WORKERS, precompute=ABE_PRECOMPUTE)
+# Outsourced decryption: workers pair with a transformation key, never the full SK
+OUTSOURCE_DECRYPTION = os.environ.get("OUTSOURCE_DECRYPTION", "0") == "1"
+if OUTSOURCE_DECRYPTION and not crypto.abe.supports_transform:
+    print(f"OUTSOURCE_DECRYPTION ignored: {ABE_SCHEME} has no transformation keys")
+    OUTSOURCE_DECRYPTION = False
+# PQC sessions: one Kyber768 encapsulation reused for many downloads
+PQC_SESSION_TTL = int(os.environ.get("PQC_SESSION_TTL", 900))
+PQC_SESSION_MAX_TRANSFERS = int(os.environ.get("PQC_SESSION_MAX_TRANSFERS", 500))
+crypto.configure_pqc_sessions(PQC_SESSION_TTL, PQC_SESSION_MAX_TRANSFERS)
+# File body AEAD: "auto" benchmarks the available suites on this CPU at startup
+CIPHER_SUITE = os.environ.get("CIPHER_SUITE", "auto")
+crypto.select_cipher_suite(CIPHER_SUITE)
+# Compress uploads before encryption when the first chunk shows it pays off
+crypto.configure_compression(os.environ.get("COMPRESSION", "auto"))
+
+# Background check of S3 objects against their chunk Merkle trees (0 = off)
+SCRUB_INTERVAL = int(os.environ.get("SCRUB_INTERVAL", 86400))
+scrubber = ScrubComponent(s3c, file_comp, crypto, interval_seconds=SCRUB_INTERVAL)
+if SCRUB_INTERVAL > 0:
+    scrubber.start()
+
+# Master key rotation: stale abe_cts / user SKs move to the new epoch on access or in the background
+rotation = KeyRotationComponent(crypto, file_comp, user_comp, outsource=OUTSOURCE_DECRYPTION)
 
 UPLOAD_TEMP_DIR = "uploads"
 os.makedirs(UPLOAD_TEMP_DIR, exist_ok=True)
 
-# --- Blockchain Configuration ---
-# Use the RPC URL from your Anvil terminal
-RPC_URL = "http://127.0.0.1:8545"
-w3 = Web3(Web3.HTTPProvider(RPC_URL))
-CONTRACT_ADDRESS ="0x5FbDB2315678afecb367f032d93F642f64180aa3"
-CONTRACT_ABI = [
-    {
-        "type": "function",
-        "name": "logAccess",
-        "inputs": [
-            {"name": "_username", "type": "string"},
-            {"name": "_fileId", "type": "string"},
-            {"name": "_action", "type": "string"},
-            {"name": "_granted", "type": "bool"},
-            {"name": "_reason", "type": "string"}
-        ],
-        "outputs": [],
-        "stateMutability": "nonpayable"
-    }
-]
-contract = w3.eth.contract(address=CONTRACT_ADDRESS, abi=CONTRACT_ABI)
-# Using the first default account from Anvil
-PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
-ACCOUNT_ADDRESS = "0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266"
-
-def log_to_blockchain(username, file_id, action, granted, reason):
-    """Sends an access audit log to the Ethereum Smart Contract and returns gas used."""
-    try:
-        nonce = w3.eth.get_transaction_count(ACCOUNT_ADDRESS)
-        tx = contract.functions.logAccess(
-            username, file_id, action, granted, reason
-        ).build_transaction({
-            'from': ACCOUNT_ADDRESS,
-            'nonce': nonce,
-            'gas': 200000,
-            'gasPrice': w3.to_wei('20', 'gwei')
-        })
-        signed_tx = w3.eth.account.sign_transaction(tx, PRIVATE_KEY)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-        
-        # --- NEW: Capture receipt to get gas metrics ---
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        gas_used = receipt.get('gasUsed', 0)
-        
-        print(f"Blockchain Audit Logged: {file_id} for {username} (TX: {w3.to_hex(tx_hash)}) | Gas: {gas_used}")
-        return gas_used  # Returning this allows your benchmark script to save it
-    except Exception as e:
-        print(f"Blockchain logging failed: {e}")
-        return 0
+# Audit records are queued and mined in the background unless AUDIT_ASYNC=0.
+# AUDIT_MODE=anchor keeps records locally and anchors one Merkle root per window instead
+# of one logAccess transaction per record (needs the anchorRoot contract, always async).
+# AUDIT_ENCODING=v2 sends fixed-size hashes to AUDIT_CONTRACT_V2 and keeps the plaintext in
+# AUDIT_RECORD_LOG (also always async, since the pipeline is what writes that log).
+AUDIT_MODE = os.environ.get("AUDIT_MODE", "tx")
+AUDIT_ENCODING = os.environ.get("AUDIT_ENCODING", "v1")
+if AUDIT_ENCODING == "v2" and contract_v2 is None:
+    raise RuntimeError("AUDIT_ENCODING=v2 needs AUDIT_CONTRACT_V2 (address of the deployed AccessLogV2)")
+AUDIT_ASYNC = os.environ.get("AUDIT_ASYNC", "1") == "1" or AUDIT_MODE == "anchor" or AUDIT_ENCODING == "v2"
+# Write-ahead journal: records are fsynced here before queueing and replayed until confirmed ("" = off)
+AUDIT_JOURNAL = os.environ.get("AUDIT_JOURNAL", "audit_journal.log")
+audit_journal = AuditJournal(AUDIT_JOURNAL) if AUDIT_ASYNC and AUDIT_JOURNAL else None
+audit = AuditComponent(
+    w3, contract_v2 if AUDIT_ENCODING == "v2" else contract, signers,
+    max_queue=int(os.environ.get("AUDIT_QUEUE_SIZE", 10000)),
+    max_inflight=int(os.environ.get("AUDIT_MAX_INFLIGHT", 64)),
+    mode=AUDIT_MODE,
+    anchor_store=AnchorStore(os.environ.get("AUDIT_BATCH_DIR", "audit_batches")) if AUDIT_MODE == "anchor" else None,
+    anchor_window=float(os.environ.get("AUDIT_ANCHOR_WINDOW", 30)),
+    anchor_batch_size=int(os.environ.get("AUDIT_ANCHOR_BATCH", 1024)),
+    journal=audit_journal,
+    replay_interval=float(os.environ.get("AUDIT_REPLAY_INTERVAL", 10)),
+    encoding=AUDIT_ENCODING,
+    record_log=RecordLog(os.environ.get("AUDIT_RECORD_LOG", "audit_records.jsonl")) if AUDIT_ENCODING == "v2" else None,
+)
+if audit_journal:
+    atexit.register(audit_journal.close)
+if AUDIT_ASYNC:
+    audit.start()
+    atexit.register(audit.stop)
+
+def audit_log(username, file_id, action, granted, reason):
+    """Record an audit event without waiting for the chain (sync fallback when AUDIT_ASYNC=0)."""
+    if AUDIT_ASYNC:
+        return audit.submit(username, file_id, action, granted, reason)
+    return log_to_blockchain(username, file_id, action, granted, reason)
 # ---------------- Register ----------------
 @app.route("/register", methods=["POST"])
 def register():
@@ -97,9 +126,8 @@ def register():
 
         print(f"--- Processing Registration for {username} ---")
 
-        ok, res = user_comp.register_user(username, attrs, location, department)
-        if not ok:
-            return jsonify({"success": False, "error": res}), 400
+        if user_comp.get_user(username):
+            return jsonify({"success": False, "error": "User exists"}), 400
 
         # Waters11 CP-ABE Setup
         try:
@@ -109,12 +137,18 @@ def register():
             crypto.setup(force=True)
             crypto.save_master_keys()
 
-        # Generate Key
-        abe_sk_b64 = crypto.generate_user_secret(attrs)
-        user_comp.set_user_abe_sk(username, abe_sk_b64)
+        # Generate every key first, so a keygen failure leaves nothing half-registered
+        keys = {"abe_sk_epoch": crypto.key_epoch}
+        keys["abe_sk"] = crypto.submit_keygen(attrs).result()
+        if OUTSOURCE_DECRYPTION:
+            keys["abe_tk"], keys["abe_rk"] = crypto.generate_transform_key(keys["abe_sk"])
+
+        ok, res = user_comp.register_user(username, attrs, location, department, keys=keys)
+        if not ok:
+            return jsonify({"success": False, "error": res}), 400
 
         try:
-            log_to_blockchain(username, "N/A", "REGISTER_USER", True, f"Sttrs: {','.join(attrs)}")
+            audit_log(username, "N/A", "REGISTER_USER", True, f"Sttrs: {','.join(attrs)}")
         except Exception as be:
             print(f"Blockchain logging failed but user was registered: {be}")
         
@@ -127,6 +161,68 @@ def register():
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
+# ---------------- Batch Register ----------------
+@app.route("/register_batch", methods=["POST"])
+def register_batch():
+    """Onboard many users at once: batched keygen (on the worker pool when CRYPTO_WORKERS > 0), then one db.json write."""
+    try:
+        data = request.get_json()
+        users = (data or {}).get("users")
+        if not users or not isinstance(users, list):
+            return jsonify({"success": False, "error": "users list required"}), 400
+        for i, u in enumerate(users):
+            if not isinstance(u, dict):
+                return jsonify({"success": False, "error": f"users[{i}] must be an object"}), 400
+            if u.get("username") is not None and not isinstance(u["username"], str):
+                return jsonify({"success": False, "error": f"users[{i}].username must be a string"}), 400
+
+        # Drop missing, existing and duplicate usernames before paying for keygen;
+        # errors are keyed by the entry's index in the request
+        errors, pending, index_of = {}, [], {}
+        for i, u in enumerate(users):
+            username = u.get("username")
+            if not username:
+                errors[str(i)] = "missing username"
+            elif username in index_of or user_comp.get_user(username):
+                errors[str(i)] = "User exists"
+            else:
+                index_of[username] = i
+                pending.append(u)
+
+        print(f"--- Processing Batch Registration for {len(pending)} users ---")
+        try:
+            crypto.load_master_keys()
+        except Exception:
+            print("Master keys missing, initializing...")
+            crypto.setup(force=True)
+            crypto.save_master_keys()
+
+        key_epoch = crypto.key_epoch
+        secrets = crypto.generate_user_secrets_batch([u.get("attributes", []) for u in pending])
+        for u, sk in zip(pending, secrets):
+            u["abe_sk"] = sk
+            u["abe_sk_epoch"] = key_epoch
+            if OUTSOURCE_DECRYPTION:
+                u["abe_tk"], u["abe_rk"] = crypto.generate_transform_key(sk)
+        registered, reg_errors = user_comp.register_users_batch(pending)
+        errors.update({str(index_of[username]): error for username, error in reg_errors.items()})
+
+        if registered:
+            audit_log("batch", "N/A", "REGISTER_USER_BATCH", True,
+                              f"Users: {len(registered)}")
+
+        return jsonify({
+            "success": True,
+            "registered": [r["username"] for r in registered],
+            "errors": errors,
+        })
+
+    except Exception as e:
+        print(f"CRITICAL ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
 # ---------------- Login (for CLI compat) ----------------
 @app.route("/login", methods=["POST"])
 def login():
@@ -137,6 +233,13 @@ def login():
         return jsonify({"ok": False, "error": "unknown user"}), 404
     return jsonify({"ok": True, "user": user}), 200
 
+def _remove_quietly(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except Exception:
+            pass
+
 # ---------------- Upload ----------------
 @app.route("/upload", methods=["POST"])
 def upload():
@@ -173,12 +276,13 @@ def upload():
 
     #BACK TO S3 UPLOAD (using real credentials)
     s3_key = f"enc/{uuid.uuid4()}_{fname}.enc"
-    if not s3c.upload_file(meta["enc_file_path"], s3_key):
+    index_key = s3_key + ".idx"
+    if not s3c.upload_file(meta["enc_file_path"], s3_key) or not s3c.upload_file(meta["index_file_path"], index_key):
         return jsonify({"success": False, "error": "s3 upload failed"}), 500
 
     # Register in database
-    fid = file_comp.register_encrypted_file(username, meta, s3_key=s3_key)
-    log_to_blockchain(username, fid, "UPLOAD", True, f"Policy: {policy}")
+    fid = file_comp.register_encrypted_file(username, meta, s3_key=s3_key, index_key=index_key)
+    audit_log(username, fid, "UPLOAD", True, f"Policy: {policy}")
 
     # Handle context policies
     applied_policy = None
@@ -209,11 +313,7 @@ def upload():
             file_comp.set_context_policy(fid, cp)
 
     #Clean up local encrypted file after S3 upload
-    try:
-        os.remove(meta["enc_file_path"])
-        os.remove(local_path)  # Also remove original temp file
-    except Exception:
-        pass
+    _remove_quietly(meta["enc_file_path"], meta["index_file_path"], local_path)
 
     return jsonify({"success": True, "file_id": fid, "s3_key": s3_key})
 
@@ -229,6 +329,65 @@ def list_files_alias():
     return list_files()
 
 # ---------------- Download ----------------
+def _download_range(username, fid, user, fmeta, byte_range):
+    """Serve one byte range, fetching and decrypting only the chunks that cover it."""
+    size = fmeta["chunk_index"]["plain_size"]
+    span = byte_range.range_for_length(size)
+    if span is None:
+        return Response(status=416, headers={"Content-Range": f"bytes */{size}"})
+    start, stop = span
+
+    abe_sk_b64 = user.get("abe_sk")
+    if not abe_sk_b64:
+        return jsonify({"success": False, "error": "user has no Waters11 abe key"}), 500
+    try:
+        crypto.load_master_keys()
+        transform_keys = None
+        if OUTSOURCE_DECRYPTION and user.get("abe_tk") and user.get("abe_rk"):
+            transform_keys = (user["abe_tk"], user["abe_rk"])
+        aes_key = crypto.recover_file_key(
+            fmeta["abe_ct"], abe_sk_b64,
+            sk_cache_key=(username, user.get("abe_sk_version", 0)),
+            transform_keys=transform_keys,
+        )
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Waters11 decryption failed: {e}"}), 500
+
+    # Frame offsets and Merkle leaves live in a sidecar object next to the ciphertext
+    sidecar = None
+    if fmeta.get("index_key"):
+        sidecar = s3c.get_bytes(fmeta["index_key"])
+        if sidecar is None:
+            return jsonify({"success": False, "error": "s3 download failed"}), 500
+    try:
+        index, merkle = crypto.expand_stream_index(fmeta["chunk_index"], fmeta.get("merkle"), sidecar)
+        plan = crypto.plan_range(index, start, stop)
+    except Exception as e:
+        return jsonify({"success": False, "error": f"chunk index unusable: {e}"}), 500
+
+    body = s3c.get_range(fmeta["s3_key"], plan["ct_start"], plan["ct_end"])
+    if body is None:
+        return jsonify({"success": False, "error": "s3 download failed"}), 500
+    audit_log(username, fid, "DOWNLOAD", True, f"Authorized and Decrypted (bytes {start}-{stop - 1})")
+
+    def generate():
+        try:
+            yield from crypto.decrypt_range(index, aes_key, body, plan, merkle)
+        finally:
+            body.close()
+
+    return Response(
+        stream_with_context(generate()),
+        status=206,
+        mimetype="application/octet-stream",
+        headers={
+            "Content-Range": f"bytes {start}-{stop - 1}/{size}",
+            "Content-Length": str(stop - start),
+            "Accept-Ranges": "bytes",
+            "X-Orig-Filename": fmeta["orig_filename"],
+        },
+    )
+
 @app.route("/download", methods=["POST"])
 def download():
     j = request.json
@@ -251,7 +410,7 @@ def download():
 
     # Context-aware access control
     if not context_comp.check_access(fid, context):
-        log_to_blockchain(username, fid, "DOWNLOAD", False, "Context Policy Denied")
+        audit_log(username, fid, "DOWNLOAD", False, "Context Policy Denied")
         return jsonify({"success": False, "error": "context policy denied"}), 403
 
     # FL anomaly check
@@ -262,14 +421,40 @@ def download():
     # Your ensemble model uses 0.6 to maintain 94.2% accuracy
     threshold = 0.6
     if score >= threshold:
-        log_to_blockchain(username, fid, "DOWNLOAD", False, f"FL Anomaly (Score: {score})")
+        audit_log(username, fid, "DOWNLOAD", False, f"FL Anomaly (Score: {score})")
         return jsonify({"success": False, "error": "access flagged", "score": score}), 403
 
+    # Bring the user's SK and the file's abe_ct onto the current key epoch
+    try:
+        user = rotation.ensure_user_current(username)
+        fmeta = rotation.ensure_file_current(fid)
+    except Exception as e:
+        return jsonify({"success": False, "error": f"key epoch update failed: {e}"}), 500
+
     #BACK TO S3 DOWNLOAD
     s3_key = fmeta.get("s3_key")
     if not s3_key:
         return jsonify({"success": False, "error": "file not in s3"}), 500
 
+    # Range requests on indexed (stream) files fetch only the covering chunks;
+    # legacy files and PQC-wrapped downloads fall through to a full response
+    pqc_requested = j.get("pqc_public_key") or j.get("pqc_session_id")
+    if request.range is not None and fmeta.get("chunk_index") and not pqc_requested:
+        return _download_range(username, fid, user, fmeta, request.range)
+
+    # Reject a bad PQC session before any S3/ABE work; the transfer itself is taken later
+    pqc_pub_key = j.get("pqc_public_key")
+    pqc_session_id = j.get("pqc_session_id")
+    if pqc_session_id:
+        try:
+            crypto.pqc_check_session(pqc_session_id, owner=username)
+        except ValueError as e:
+            return jsonify({"success": False, "error": f"PQC setup failed: {e}"}), 400
+
+    abe_sk_b64 = user.get("abe_sk")
+    if not abe_sk_b64:
+        return jsonify({"success": False, "error": "user has no Waters11 abe key"}), 500
+
     # Download encrypted file from S3
     local_tmp = os.path.join(UPLOAD_TEMP_DIR, f"dl_{uuid.uuid4()}.enc")
     if not s3c.download_file(s3_key, local_tmp):
@@ -281,38 +466,169 @@ def download():
         "enc_file_path": local_tmp,
         "abe_ct": fmeta["abe_ct"],
         "policy": fmeta["policy"],
+        "enc_format": fmeta.get("enc_format", "gcm"),
     }
-
-    abe_sk_b64 = user.get("abe_sk")
-    if not abe_sk_b64:
-        return jsonify({"success": False, "error": "user has no Waters11 abe key"}), 500
+    # Per-request plaintext path, so concurrent downloads of one file don't share it
+    dec_path = os.path.abspath(os.path.join(UPLOAD_TEMP_DIR, f"dec_{uuid.uuid4()}"))
 
     try:
         crypto.load_master_keys()
-        dec_path = crypto.decrypt_file_hybrid(encrypted_meta, abe_sk_b64)
-        
-        # Log success to Blockchain
-        log_to_blockchain(username, fid, "DOWNLOAD", True, "Authorized and Decrypted")
-        
-        # NEW: Check if the user wants a Post-Quantum Secure transfer
-        pqc_pub_key = j.get("pqc_public_key")
-        if pqc_pub_key:
-            with open(dec_path, 'rb') as f:
-                pqc_package = crypto.pqc_encrypt_wrap(f.read(), pqc_pub_key)
-            
-            # Clean up decrypted file before sending JSON
-            os.remove(dec_path) 
-            return jsonify({"success": True, "pqc_package": pqc_package})
+        transform_keys = None
+        if OUTSOURCE_DECRYPTION and user.get("abe_tk") and user.get("abe_rk"):
+            transform_keys = (user["abe_tk"], user["abe_rk"])
+        crypto.decrypt_file_hybrid(
+            encrypted_meta, abe_sk_b64,
+            out_plain_path=dec_path,
+            sk_cache_key=(username, user.get("abe_sk_version", 0)),
+            transform_keys=transform_keys,
+        )
     except Exception as e:
+        _remove_quietly(local_tmp, dec_path)
         return jsonify({"success": False, "error": f"Waters11 decryption failed: {e}"}), 500
+    _remove_quietly(local_tmp)
 
-    # Clean up temporary downloaded file
-    try:
-        os.remove(local_tmp)
-    except Exception:
-        pass
+    # Log success to Blockchain
+    audit_log(username, fid, "DOWNLOAD", True, "Authorized and Decrypted")
+
+    # NEW: Check if the user wants a Post-Quantum Secure transfer
+    if pqc_pub_key and j.get("pqc_format") == "json":
+        try:
+            with open(dec_path, 'rb') as f:
+                pqc_package = crypto.pqc_encrypt_wrap(f.read(), pqc_pub_key)
+        except Exception as e:
+            return jsonify({"success": False, "error": f"PQC setup failed: {e}"}), 400
+        finally:
+            _remove_quietly(dec_path)
+        return jsonify({"success": True, "pqc_package": pqc_package})
+
+    if pqc_pub_key or pqc_session_id:
+        # Key setup before the response starts, so a bad key/session still gets a JSON error;
+        # the session transfer is only consumed here, once decryption has succeeded
+        try:
+            if pqc_session_id:
+                header, key = crypto.pqc_session_header(pqc_session_id, owner=username)
+            else:
+                header, key = crypto.pqc_stream_header(pqc_pub_key)
+        except Exception as e:
+            _remove_quietly(dec_path)
+            return jsonify({"success": False, "error": f"PQC setup failed: {e}"}), 400
 
-    return send_file(dec_path, as_attachment=True, download_name=fmeta["orig_filename"])
+        # Binary PQC envelope streamed frame by frame from the decrypted file
+        def generate():
+            try:
+                yield header
+                yield from crypto.pqc_seal_file(dec_path, key)
+            finally:
+                _remove_quietly(dec_path)
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype="application/octet-stream",
+            headers={"X-PQC-Envelope": header[:4].decode("ascii"), "X-Orig-Filename": fmeta["orig_filename"]},
+        )
+
+    response = send_file(dec_path, as_attachment=True, download_name=fmeta["orig_filename"])
+    response.call_on_close(lambda: _remove_quietly(dec_path))
+    return response
+
+
+# ---------------- PQC Session ----------------
+@app.route("/pqc_session", methods=["POST"])
+def pqc_session():
+    j = request.json or {}
+    username = j.get("username")
+    pub_key = j.get("pqc_public_key")
+    if not user_comp.get_user(username):
+        return jsonify({"success": False, "error": "unknown user"}), 404
+    if not pub_key:
+        return jsonify({"success": False, "error": "pqc_public_key required"}), 400
+    try:
+        return jsonify({"success": True, **crypto.pqc_open_session(pub_key, owner=username)})
+    except Exception as e:
+        return jsonify({"success": False, "error": f"PQC session setup failed: {e}"}), 400
+
+# ---------------- Key Rotation ----------------
+@app.route("/rotate_keys", methods=["POST"])
+def rotate_keys():
+    """Start a new master key epoch. Headers follow lazily; background=true also
+    re-wraps everything now, throttled to rate_per_sec files per second."""
+    j = request.json or {}
+    try:
+        crypto.load_master_keys()
+        old_epoch = crypto.key_epoch
+        new_epoch = crypto.rotate_master_keys()
+    except Exception as e:
+        return jsonify({"success": False, "error": f"rotation failed: {e}"}), 500
+    audit_log("admin", "N/A", "ROTATE_MASTER_KEYS", True, f"Epoch {old_epoch} -> {new_epoch}")
+    if j.get("background"):
+        rotation.start_background(int(j.get("rate_per_sec", 200)), int(j.get("batch_size", 100)))
+    return jsonify({"success": True, "key_epoch": new_epoch, "progress": rotation.progress()})
+
+@app.route("/rotation_status", methods=["GET"])
+def rotation_status():
+    return jsonify(rotation.progress())
+
+# ---------------- Integrity Scrub ----------------
+@app.route("/scrub", methods=["POST"])
+def scrub():
+    """Check one file (file_id) or every file against its chunk Merkle tree now."""
+    j = request.json or {}
+    fid = j.get("file_id")
+    if fid:
+        if not file_comp.get_file(fid):
+            return jsonify({"success": False, "error": "unknown file"}), 404
+        result = scrubber.scrub_file(fid)
+        if result is None:
+            return jsonify({"success": False, "error": "file has no chunk tree"}), 400
+        return jsonify({"success": True, "file_id": fid, "result": result})
+    return jsonify({"success": True, "summary": scrubber.run_once()})
+
+# ---------------- Audit proofs ----------------
+@app.route("/audit/proof/<record_id>", methods=["GET"])
+def audit_proof(record_id):
+    """Inclusion proof for one anchored audit record."""
+    if audit.mode != "anchor":
+        return jsonify({"success": False, "error": "audit anchoring is off"}), 400
+    proof = audit.prove(record_id)
+    if proof is None:
+        return jsonify({"success": False, "error": "unknown record"}), 404
+    return jsonify({"success": True, **proof})
+
+@app.route("/audit/verify", methods=["POST"])
+def audit_verify():
+    """Verify a record against a root: either {record_id} or {record, proof, root} as returned by /audit/proof."""
+    if audit.mode != "anchor":
+        return jsonify({"success": False, "error": "audit anchoring is off"}), 400
+    j = request.json or {}
+    if j.get("record_id"):
+        proof = audit.prove(j["record_id"])
+        if proof is None:
+            return jsonify({"success": False, "error": "unknown record"}), 404
+        j = proof
+    if not all(k in j for k in ("record", "proof", "root")):
+        return jsonify({"success": False, "error": "record, proof and root are required"}), 400
+    try:
+        result = audit.verify(j["record"], j["proof"], j["root"])
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"success": False, "error": f"malformed proof: {e}"}), 400
+    return jsonify({"success": True, "root": j["root"], **result})
+
+# ---------------- Metrics ----------------
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "ok": True,
+        "sk_cache": crypto.sk_cache_stats(),
+        "policy_cache": crypto.policy_cache_stats(),
+        "satisfy_cache": crypto.satisfy_cache_stats(),
+        "capsule_pool": crypto.capsule_stats(),
+        "pqc_sessions": crypto.pqc_session_stats(),
+        "cipher_suite": crypto.cipher_suite_stats(),
+        "compression": crypto.compression_stats(),
+        "scrubber": scrubber.stats(),
+        "key_rotation": rotation.progress(),
+        "audit": audit.stats() if AUDIT_ASYNC else None,
+    })
 
 #ADD THIS CRITICAL CODE TO START THE SERVER
 if __name__ == "__main__":
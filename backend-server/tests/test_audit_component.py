@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Path Setup
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from app.components.audit_component import AuditComponent, RecordLog
+from app.components.audit_journal import AuditJournal
+from app.components.signer_pool import SignerPool
+
+
+class FakeEth:
+    """Just enough of web3's eth module: in-order nonces, instant sends, receipts after a short delay."""
+
+    def __init__(self, mine_delay=0.005):
+        self.mine_delay = mine_delay
+        self.account = self
+        self.chain_id = 31337
+        self.nonce = 0
+        self.mined = {}
+        self.sent_args = Counter()
+        self._lock = threading.Lock()
+
+    def get_transaction_count(self, address, block=None):
+        return self.nonce
+
+    def sign_transaction(self, tx, key):
+        return type("Signed", (), {"raw_transaction": tx})
+
+    def send_raw_transaction(self, tx):
+        with self._lock:
+            if tx["nonce"] != self.nonce:
+                raise ValueError("nonce too low")
+            self.nonce += 1
+            self.sent_args[tx["args"]] += 1
+            tx_hash = b"%d" % tx["nonce"]
+            self.mined[tx_hash] = time.time() + self.mine_delay
+        return tx_hash
+
+    def get_transaction_receipt(self, tx_hash):
+        if time.time() < self.mined[tx_hash]:
+            raise LookupError("not mined yet")
+        return {"gasUsed": 30000, "status": 1, "blockNumber": 1}
+
+
+class FakeW3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+    def to_wei(self, value, unit):
+        return value
+
+    def to_hex(self, value):
+        return "0x" + value.hex()
+
+    def is_connected(self):
+        return True
+
+
+class FakeCall:
+    def __init__(self, args):
+        self.args = args
+
+    def build_transaction(self, fields):
+        return dict(fields, args=self.args)
+
+
+class FakeContract:
+    class functions:
+        @staticmethod
+        def logAccess(*args):
+            return FakeCall(args)
+
+
+class SlowMarkJournal(AuditJournal):
+    """Widens the gap between a receipt arriving and the journal marking the record done."""
+
+    def mark_done(self, record_ids):
+        time.sleep(0.002)
+        super().mark_done(record_ids)
+
+
+def _make_pipeline(tmp_path, **kwargs):
+    w3 = FakeW3()
+    journal = SlowMarkJournal(str(tmp_path / "journal.log"))
+    audit = AuditComponent(
+        w3, FakeContract(), SignerPool(w3, [("0xA", "key")]),
+        journal=journal, replay_interval=0.0005, poll_interval=0.001, **kwargs,
+    )
+    return w3, journal, audit
+
+
+def test_replay_during_confirms_sends_each_record_once(tmp_path):
+    w3, journal, audit = _make_pipeline(tmp_path)
+    audit.start()
+    for i in range(200):
+        audit.submit("alice", f"file-{i}", "DOWNLOAD", True, f"reason-{i}")
+    assert audit.flush(timeout=30)
+    audit.stop()
+    journal.close()
+
+    assert not journal.pending()
+    assert len(w3.eth.sent_args) == 200
+    duplicates = {args: n for args, n in w3.eth.sent_args.items() if n > 1}
+    assert duplicates == {}
+    assert audit.stats()["replayed"] == 0
+
+
+def test_replay_resends_only_records_left_unconfirmed(tmp_path):
+    w3, journal, audit = _make_pipeline(tmp_path)
+    # Journaled but never queued, as after a crash or a full queue
+    stranded = {"id": "stranded", "username": "bob", "file_id": "f", "action": "DOWNLOAD",
+                "granted": False, "reason": "left behind", "timestamp": "2026-01-01T00:00:00"}
+    journal.append(stranded)
+    audit.start()
+    for i in range(50):
+        audit.submit("alice", f"file-{i}", "DOWNLOAD", True, f"reason-{i}")
+    deadline = time.time() + 30
+    while journal.pending() and time.time() < deadline:
+        time.sleep(0.01)
+    assert audit.flush(timeout=30)
+    audit.stop()
+    journal.close()
+
+    assert not journal.pending()
+    assert audit.stats()["replayed"] == 1
+    assert w3.eth.sent_args[("bob", "f", "DOWNLOAD", False, "left behind")] == 1
+    assert max(w3.eth.sent_args.values()) == 1
+
+
+def test_v2_replay_during_confirms_sends_and_logs_each_record_once(tmp_path):
+    record_log = RecordLog(str(tmp_path / "records.jsonl"))
+    w3, journal, audit = _make_pipeline(tmp_path, encoding="v2", record_log=record_log)
+    audit.start()
+    ids = [audit.submit("alice", f"file-{i}", "DOWNLOAD", True, f"reason-{i}") for i in range(100)]
+    assert audit.flush(timeout=30)
+    audit.stop()
+    journal.close()
+
+    assert not journal.pending()
+    assert len(w3.eth.sent_args) == 100
+    assert max(w3.eth.sent_args.values()) == 1
+    with open(record_log.path) as f:
+        logged = Counter(json.loads(line)["entry"]["id"] for line in f)
+    assert logged == Counter(ids)
@@ -0,0 +1,126 @@
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Path Setup
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+pytest.importorskip("oqs")
+from app.components import crypto_component as cc
+from app.components.merkle import leaf_hash, merkle_proof, verify_proof
+
+CHUNK = 64
+KEY = bytes(range(32))
+
+
+def _write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def _frame_offsets(enc: bytes) -> list[int]:
+    """Start of every frame in a stream file, from the length prefixes."""
+    header = cc._read_stream_header(io.BytesIO(enc))[0]
+    offsets, pos = [], len(header)
+    while pos < len(enc):
+        offsets.append(pos)
+        (length,) = cc._FRAME_LEN.unpack(enc[pos:pos + cc._FRAME_LEN.size])
+        pos += cc._FRAME_LEN.size + length + cc.STREAM_TAG_SIZE
+    return offsets
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK, 3 * CHUNK + 5])
+def test_stream_round_trip(tmp_path, size):
+    data = os.urandom(size)
+    src = _write(tmp_path, "plain", data)
+    enc, out = str(tmp_path / "enc"), str(tmp_path / "out")
+    cc._aes_encrypt_file_stream(src, enc, KEY, chunk_size=CHUNK)
+    cc._aes_decrypt_file_stream(enc, out, KEY)
+    with open(out, "rb") as f:
+        assert f.read() == data
+
+
+def test_stream_cut_at_frame_boundary_is_rejected(tmp_path):
+    src = _write(tmp_path, "plain", os.urandom(3 * CHUNK))
+    enc, out = str(tmp_path / "enc"), str(tmp_path / "out")
+    cc._aes_encrypt_file_stream(src, enc, KEY, chunk_size=CHUNK)
+    with open(enc, "rb") as f:
+        stored = f.read()
+    # Drop the last frame whole; the new last frame was sealed as non-final
+    cut = _write(tmp_path, "cut", stored[:_frame_offsets(stored)[-1]])
+    with pytest.raises(ValueError):
+        cc._aes_decrypt_file_stream(cut, out, KEY)
+    assert not os.path.exists(out)
+
+
+@pytest.mark.parametrize("size", [0, CHUNK, 9 * CHUNK + 7])
+def test_parallel_output_matches_stream_format(tmp_path, size):
+    data = os.urandom(size)
+    src = _write(tmp_path, "plain", data)
+    enc, out, out2 = str(tmp_path / "enc"), str(tmp_path / "out"), str(tmp_path / "out2")
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        cc._aes_encrypt_file_parallel(src, enc, KEY, pool, 4, chunk_size=CHUNK)
+        cc._aes_decrypt_file_parallel(enc, out, KEY, pool, 4)
+    cc._aes_decrypt_file_stream(enc, out2, KEY)
+    for path in (out, out2):
+        with open(path, "rb") as f:
+            assert f.read() == data
+
+
+def _compressible(size):
+    return b"".join(b"2026-10-17,user%d,DOWNLOAD,granted\n" % (i % 5) for i in range(size // 34 + 1))[:size]
+
+
+def _sealed(tmp_path, data):
+    src = _write(tmp_path, "plain", data)
+    enc = str(tmp_path / "enc")
+    indexer = cc._StreamIndexer()
+    codec = cc._aes_encrypt_file_stream(src, enc, KEY, chunk_size=CHUNK, suite=cc.DEFAULT_CIPHER_SUITE,
+                                        codec=cc.COMPRESSION_CODECS["zlib"], indexer=indexer)
+    sidecar = str(tmp_path / "enc.idx")
+    indexer.write_sidecar(sidecar)
+    with open(enc, "rb") as f, open(sidecar, "rb") as s:
+        stored = f.read()
+        index, merkle = cc._expand_stream_index(*indexer.metadata(len(data)), s.read())
+    return codec, stored, index, merkle
+
+
+def test_ranged_decrypt_over_compressed_frames(tmp_path):
+    data = _compressible(10 * CHUNK + 9)
+    codec, stored, index, merkle = _sealed(tmp_path, data)
+    assert codec == cc.COMPRESSION_CODECS["zlib"]
+    assert index["frame_offsets"] == _frame_offsets(stored)
+    for start, stop in [(0, 1), (CHUNK - 1, CHUNK + 1), (3 * CHUNK + 2, 7 * CHUNK), (len(data) - 5, len(data))]:
+        plan = cc._plan_stream_range(index, start, stop)
+        body = io.BytesIO(stored[plan["ct_start"]:plan["ct_end"] + 1])
+        assert b"".join(cc._decrypt_stream_range(index, KEY, body, plan, merkle)) == data[start:stop]
+
+
+def test_tampered_chunk_fails_merkle_checks(tmp_path):
+    data = _compressible(6 * CHUNK)
+    _, stored, index, merkle = _sealed(tmp_path, data)
+    assert cc._verify_stream_object(index, merkle, io.BytesIO(stored))["ok"]
+
+    bounds = index["frame_offsets"] + [index["enc_size"]]
+    tampered = bytearray(stored)
+    tampered[bounds[2] + 6] ^= 0x01
+    frame = bytes(tampered[bounds[2]:bounds[3]])
+
+    leaves = [bytes.fromhex(leaf) for leaf in merkle["leaves"]]
+    root = bytes.fromhex(merkle["root"])
+    assert verify_proof(leaves[2], merkle_proof(leaves, 2), root)
+    assert not verify_proof(leaf_hash(frame), merkle_proof(leaves, 2), root)
+
+    result = cc._verify_stream_object(index, merkle, io.BytesIO(bytes(tampered)))
+    assert not result["ok"] and result["bad_chunks"] == [2]
+    plan = cc._plan_stream_range(index, 2 * CHUNK, 3 * CHUNK)
+    body = io.BytesIO(bytes(tampered[plan["ct_start"]:plan["ct_end"] + 1]))
+    with pytest.raises(ValueError, match="Merkle leaf"):
+        b"".join(cc._decrypt_stream_range(index, KEY, body, plan, merkle))
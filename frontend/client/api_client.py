@@ -6,9 +6,9 @@ class APIClient:
     def __init__(self, base_url="http://127.0.0.1:5001"): 
         self.base = base_url.rstrip("/")
 
-    def post(self, path, json=None, files=None, data=None, stream=False):
+    def post(self, path, json=None, files=None, data=None, stream=False, headers=None):
         url = f"{self.base}{path}"
-        return requests.post(url, json=json, files=files, data=data, stream=stream)
+        return requests.post(url, json=json, files=files, data=data, stream=stream, headers=headers)
 
     def get(self, path, params=None):
         url = f"{self.base}{path}"
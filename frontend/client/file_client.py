@@ -1,5 +1,6 @@
 # client/file_client.py
 from .api_client import APIClient
+from .pqc_stream import PQCSession, new_kem, unwrap_pqc_stream
 
 class FileClient:
     def __init__(self, api: APIClient):
@@ -34,3 +35,71 @@ class FileClient:
             return r.json(), r.status_code
         except:
             return {"ok":False, "msg":"unknown error"}, r.status_code
+
+    def download_file_range(self, username, file_id, user_context, access_features, save_to, start=0, end=None):
+        """Fetch bytes start..end (inclusive, end=None for the rest) via an HTTP Range request.
+
+        With start > 0 the bytes are appended to save_to, so passing its current
+        size resumes an interrupted download. Servers that answer 200 instead of
+        206 sent the whole file, which then replaces save_to.
+        """
+        payload = {"username": username, "file_id": file_id, "user_context": user_context, "access_features": access_features}
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        r = self.api.post("/download", json=payload, stream=True, headers={"Range": byte_range})
+        if r.status_code in (200, 206):
+            mode = "ab" if r.status_code == 206 and start > 0 else "wb"
+            with open(save_to, mode) as f:
+                for chunk in r.iter_content(chunk_size=8192):
+                    if chunk:
+                        f.write(chunk)
+            return {"ok": True, "msg": "saved", "content_range": r.headers.get("Content-Range")}, r.status_code
+        if r.status_code == 416:
+            return {"ok": False, "msg": "range not satisfiable", "content_range": r.headers.get("Content-Range")}, 416
+        try:
+            return r.json(), r.status_code
+        except:
+            return {"ok": False, "msg": "unknown error"}, r.status_code
+
+    def download_file_pqc(self, username, file_id, user_context, access_features, save_to):
+        """Download over the streaming Kyber768 envelope and unwrap it chunk by chunk."""
+        kem, pub_hex = new_kem()
+        try:
+            payload = {"username": username, "file_id": file_id, "user_context": user_context,
+                       "access_features": access_features, "pqc_public_key": pub_hex}
+            r = self.api.post("/download", json=payload, stream=True)
+            if r.status_code == 200 and r.headers.get("X-PQC-Envelope") == "PQS1":
+                r.raw.decode_content = True
+                unwrap_pqc_stream(r.raw, kem, save_to)
+                return {"ok": True, "msg": "saved (pqc)"}, 200
+            try:
+                return r.json(), r.status_code
+            except:
+                return {"ok": False, "msg": "unknown error"}, r.status_code
+        finally:
+            kem.free()
+
+    def open_pqc_session(self, username):
+        """Run one Kyber768 exchange with the server; returns a PQCSession or (error, status)."""
+        kem, pub_hex = new_kem()
+        try:
+            r = self.api.post("/pqc_session", json={"username": username, "pqc_public_key": pub_hex})
+            j = r.json()
+            if r.status_code != 200 or not j.get("success"):
+                return j, r.status_code
+            return PQCSession(kem, j["session_id"], j["kem_ct"]), 200
+        finally:
+            kem.free()
+
+    def download_file_pqc_session(self, session, username, file_id, user_context, access_features, save_to):
+        """Download under an open PQCSession, so no per-file encapsulation is needed."""
+        payload = {"username": username, "file_id": file_id, "user_context": user_context,
+                   "access_features": access_features, "pqc_session_id": session.session_id.hex()}
+        r = self.api.post("/download", json=payload, stream=True)
+        if r.status_code == 200 and r.headers.get("X-PQC-Envelope") == "PQSS":
+            r.raw.decode_content = True
+            unwrap_pqc_stream(r.raw, None, save_to, session=session)
+            return {"ok": True, "msg": "saved (pqc session)"}, 200
+        try:
+            return r.json(), r.status_code
+        except:
+            return {"ok": False, "msg": "unknown error"}, r.status_code
@@ -0,0 +1,137 @@
+# client/pqc_stream.py
+"""
+Client side of the streaming PQC download envelope:
+
+    MAGIC "PQS1" | kem_ct_len(2) | kem_ct | header(17) | frames
+    MAGIC "PQSS" | session_id(16) | salt(16) | header(17) | frames
+
+header = MAGIC "SCF1" | version(1) | chunk_size(4) | nonce_prefix(8)
+frame  = length(4) | AES-GCM ciphertext | tag(16)
+
+Each frame is decrypted with nonce = nonce_prefix | frame_index and AAD =
+header | final flag, so reordered or truncated downloads are rejected.
+
+PQSS streams skip the per-download encapsulation: the key comes from a
+PQCSession opened once via /pqc_session, then HKDF'd with the stream's salt.
+"""
+import os
+import struct
+
+import oqs
+from Crypto.Cipher import AES
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+
+PQC_STREAM_MAGIC = b"PQS1"
+PQC_SESSION_MAGIC = b"PQSS"
+PQC_SESSION_ID_SIZE = 16
+PQC_TRANSFER_SALT_SIZE = 16
+PQC_KEM_ALG = "Kyber768"
+STREAM_MAGIC = b"SCF1"
+STREAM_VERSION = 1
+TAG_SIZE = 16
+_STREAM_HEADER = struct.Struct(">4sBI8s")
+
+
+def _read_exact(f, n):
+    """Read exactly n bytes (fewer only at end of stream)."""
+    buf = bytearray()
+    while len(buf) < n:
+        piece = f.read(n - len(buf))
+        if not piece:
+            break
+        buf += piece
+    return bytes(buf)
+
+
+def _read_frame(f, chunk_size):
+    raw_len = _read_exact(f, 4)
+    if not raw_len:
+        return None
+    if len(raw_len) != 4:
+        raise ValueError("PQC stream is truncated")
+    (length,) = struct.unpack(">I", raw_len)
+    if length > chunk_size:
+        raise ValueError("PQC stream frame exceeds chunk size")
+    body = _read_exact(f, length + TAG_SIZE)
+    if len(body) != length + TAG_SIZE:
+        raise ValueError("PQC stream is truncated")
+    return body[:length], body[length:]
+
+
+class PQCSession:
+    """Client half of a server PQC session: decapsulates once, then derives a
+    per-transfer key from the salt at the start of each PQSS stream."""
+
+    def __init__(self, kem, session_id_hex, kem_ct_hex):
+        self.session_id = bytes.fromhex(session_id_hex)
+        shared_secret = kem.decap_secret(bytes.fromhex(kem_ct_hex))
+        self._session_key = HKDF(shared_secret, 32, self.session_id, SHA256, context=b"pqc-session")
+
+    def transfer_key(self, salt):
+        return HKDF(self._session_key, 32, salt, SHA256, context=b"pqc-transfer")
+
+
+def _read_stream_key(f, kem, session):
+    magic = _read_exact(f, 4)
+    if magic == PQC_STREAM_MAGIC:
+        if kem is None:
+            raise ValueError("PQS1 stream needs the request's KEM secret key")
+        (kem_len,) = struct.unpack(">H", _read_exact(f, 2))
+        kem_ct = _read_exact(f, kem_len)
+        if len(kem_ct) != kem_len:
+            raise ValueError("PQC stream is truncated")
+        return kem.decap_secret(kem_ct)
+    if magic == PQC_SESSION_MAGIC:
+        if session is None:
+            raise ValueError("PQSS stream needs an open PQCSession")
+        session_id = _read_exact(f, PQC_SESSION_ID_SIZE)
+        salt = _read_exact(f, PQC_TRANSFER_SALT_SIZE)
+        if len(salt) != PQC_TRANSFER_SALT_SIZE:
+            raise ValueError("PQC stream is truncated")
+        if session_id != session.session_id:
+            raise ValueError("PQC stream belongs to a different session")
+        return session.transfer_key(salt)
+    raise ValueError("Not a PQC stream envelope")
+
+
+def unwrap_pqc_stream(f, kem, out_path, session=None):
+    """Decrypt a PQS1 or PQSS stream from file-like f into out_path.
+
+    kem is the oqs.KeyEncapsulation holding the secret key whose public half
+    was sent with the download request (PQS1); session is the PQCSession the
+    download was requested under (PQSS). The output is removed on any failure.
+    """
+    try:
+        key = _read_stream_key(f, kem, session)
+
+        header = _read_exact(f, _STREAM_HEADER.size)
+        if len(header) != _STREAM_HEADER.size:
+            raise ValueError("PQC stream is truncated")
+        s_magic, version, chunk_size, nonce_prefix = _STREAM_HEADER.unpack(header)
+        if s_magic != STREAM_MAGIC or version != STREAM_VERSION:
+            raise ValueError("Unsupported PQC stream body")
+
+        with open(out_path, "wb") as out:
+            current = _read_frame(f, chunk_size)
+            if current is None:
+                raise ValueError("PQC stream has no frames")
+            index = 0
+            while current is not None:
+                nxt = _read_frame(f, chunk_size)
+                final = nxt is None
+                cipher = AES.new(key, AES.MODE_GCM, nonce=nonce_prefix + struct.pack(">I", index))
+                cipher.update(header + (b"\x01" if final else b"\x00"))
+                out.write(cipher.decrypt_and_verify(*current))
+                current = nxt
+                index += 1
+    except Exception:
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        raise
+
+
+def new_kem():
+    """Fresh Kyber768 keypair; returns (kem, public_key_hex). Free kem when done."""
+    kem = oqs.KeyEncapsulation(PQC_KEM_ALG)
+    return kem, kem.generate_keypair().hex()
@@ -10,6 +10,11 @@ class UserClient:
         r = self.api.post("/register", json=payload)
         return r.json(), r.status_code
 
+    def register_batch(self, users):
+        # users: list of {"username", "attributes", "location", "department"}
+        r = self.api.post("/register_batch", json={"users": users})
+        return r.json(), r.status_code
+
     def login(self, username):
         r = self.api.post("/login", json={"username": username})
         return r.json(), r.status_code